@@ -1,82 +1,51 @@
-"""The H806SB Led Controller integration."""
-
-from __future__ import annotations
-
-import logging
-
-from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.const import Platform
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
-
-from .const import DOMAIN, TRACK_INTERVAL
-from .controller import LedController
-from datetime import timedelta
-
-_LOGGER = logging.getLogger(__name__)
-_PLATFORMS: list[str] = ["light"]
-
-async def async_setup(hass: HomeAssistant, config: dict):
-    """Setting integration by configuration.yaml."""
-    return True
-
-async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
-    """Setting up from a config entry."""
-    
-    controller = LedController(host=entry.data["host"])
-
-    # Create coordinator for periodically check
-    coordinator = H806SBCoordinator(hass, controller)
-    await coordinator.async_config_entry_first_refresh()
-
-    config = {**entry.data, **entry.options}
-    if entry.options:
-        hass.config_entries.async_update_entry(entry, data=config, options={})
-
-    _LOGGER.debug("Initializing H806SB controller entry (%s)", config)
-
-    # Default config creation
-    hass.data.setdefault(DOMAIN, {})
-    
-    hass.data[DOMAIN][entry.entry_id] = {
-        "controller": controller,
-        "coordinator": coordinator
-    }
-
-    """Settings integration by UI."""
-    await hass.config_entries.async_forward_entry_setups(entry, _PLATFORMS)
-    return True
-
-class H806SBCoordinator(DataUpdateCoordinator):
-    """Coordiantor for periodically check."""
-    
-    def __init__(self, hass, controller):
-        """Initialize."""
-        super().__init__(
-            hass,
-            _LOGGER,
-            name="H806SB Device Status",
-            update_interval=TRACK_INTERVAL
-        )
-        self.controller = controller
-        
-    async def _async_update_data(self):
-        """Checking the available devices."""
-        try:
-            available = await self.controller.async_check_availability()
-            _LOGGER.debug(f"available:{available}")
-            return {"available": available}
-        except Exception as err:
-            _LOGGER.error("Error checking device availability: %s", err)
-            raise UpdateFailed(f"Error checking device: {err}")
-
-
-async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Upload integrations."""
-    if unload_ok := await hass.config_entries.async_unload_platforms(entry, _PLATFORMS):
-        # Remove data of integration
-        hass.data[DOMAIN].pop(entry.entry_id)
-        # In case last integration - clear domain
-        if not hass.data[DOMAIN]:
-            hass.data.pop(DOMAIN)
-    return unload_ok
\ No newline at end of file
+"""The H806SB Led Controller integration.
+
+The protocol modules (codec, transport, controller, discovery, ...) do not
+import Home Assistant, so scripts and the command line tool (``python -m
+<package>``) can use them without it. The Home Assistant setup lives in
+:mod:`.integration` and is imported the first time one of its hooks is
+looked up here, or right away when Home Assistant is running:
+it imports integrations in an executor and flags imports made later on
+its event loop.
+"""
+
+from __future__ import annotations
+
+import importlib
+import sys
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING or "homeassistant" in sys.modules:
+    from .integration import (
+        CONFIG_SCHEMA,
+        async_get_discovery,
+        async_get_sweep,
+        async_get_transport,
+        async_migrate_entry,
+        async_scan_devices,
+        async_setup,
+        async_setup_entry,
+        async_unload_entry,
+    )
+
+# Names served by .integration; any other lookup (e.g. a submodule during
+# ``from . import codec``) must not pull in Home Assistant
+_INTEGRATION_NAMES = frozenset({
+    "CONFIG_SCHEMA",
+    "async_get_discovery",
+    "async_get_sweep",
+    "async_get_transport",
+    "async_migrate_entry",
+    "async_scan_devices",
+    "async_setup",
+    "async_setup_entry",
+    "async_unload_entry",
+})
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _INTEGRATION_NAMES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(".integration", __name__), name)
+    globals()[name] = value
+    return value
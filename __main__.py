@@ -0,0 +1,7 @@
+"""Run the command line tool, see :mod:`.cli`."""
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
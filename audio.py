@@ -0,0 +1,345 @@
+"""Audio-reactive lighting for H806SB controllers.
+
+PCM audio is read and analysed in a worker process: a vectorized NumPy
+FFT turns each block into band energies, which become a brightness and
+a colour. Frames come back through a shared-memory ring, so the event
+loop only copies a few bytes per frame and sends them as one burst.
+
+PCM is signed 16-bit little-endian mono, read from a file, a named pipe
+or a UNIX socket (``unix:/path/to/socket``). Regular files are played
+back in real time.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+import logging
+import multiprocessing
+from multiprocessing import shared_memory
+import os
+import socket
+import stat
+import struct
+import time
+from typing import Any
+
+from .controller import LedController, async_send_burst
+from .metrics import Histogram
+from .transition import FrameClock
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_RATE = 44100
+DEFAULT_FPS = 30
+DEFAULT_BANDS = 3  # bass, mid and treble drive red, green and blue
+RING_SLOTS = 16
+# Time constant of the automatic gain, in frames
+GAIN_DECAY = 0.995
+MIN_FREQUENCY = 40.0
+
+# Latency and loop lag buckets in milliseconds
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 33, 50, 100, 200, 500)
+
+# Ring header: write count (written by the worker), stop flag (by the
+# loop); slot: sequence, capture time (monotonic, shared by all
+# processes), brightness 0-31 and RGB
+_COUNT = struct.Struct("<Q")
+_STOP_OFFSET = 8
+_HEADER_SIZE = 16
+_SLOT = struct.Struct("<QdBBBB4x")
+
+
+class FrameRing:
+    """Single-writer ring of audio frames in shared memory.
+
+    A slot is written payload first and sequence last; the reader checks
+    the sequence before and after copying, so it never sees a torn frame.
+    """
+
+    def __init__(self, name: str | None = None, slots: int = RING_SLOTS) -> None:
+        size = _HEADER_SIZE + slots * _SLOT.size
+        self.slots = slots
+        self._owner = name is None
+        if self._owner:
+            self._memory = shared_memory.SharedMemory(create=True, size=size)
+            self._memory.buf[:size] = bytes(size)
+        else:
+            # Only the creator unlinks. Before Python 3.13 attaching registers
+            # the name again with the tracker shared with the parent, which
+            # is harmless; unregistering here would drop the parent's entry
+            try:
+                self._memory = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:
+                self._memory = shared_memory.SharedMemory(name=name)
+        self.name = self._memory.name
+
+    @property
+    def written(self) -> int:
+        """Return the number of frames written so far."""
+        return _COUNT.unpack_from(self._memory.buf)[0]
+
+    @property
+    def stopped(self) -> bool:
+        """Return True once the reader asked the writer to stop."""
+        return bool(self._memory.buf[_STOP_OFFSET])
+
+    def request_stop(self) -> None:
+        """Ask the writer to stop after the current block."""
+        self._memory.buf[_STOP_OFFSET] = 1
+
+    def write(self, captured: float, brightness: int, rgb: tuple[int, int, int]) -> None:
+        """Store one frame (writer side)."""
+        sequence = self.written + 1
+        offset = _HEADER_SIZE + (sequence % self.slots) * _SLOT.size
+        # Payload first, then the sequence that publishes it
+        _SLOT.pack_into(self._memory.buf, offset, 0, captured, brightness, *rgb)
+        _COUNT.pack_into(self._memory.buf, offset, sequence)
+        _COUNT.pack_into(self._memory.buf, 0, sequence)
+
+    def read_latest(self) -> tuple[int, float, int, tuple[int, int, int]] | None:
+        """Return (sequence, captured, brightness, rgb) of the newest frame."""
+        sequence = self.written
+        if not sequence:
+            return None
+        offset = _HEADER_SIZE + (sequence % self.slots) * _SLOT.size
+        stored, captured, brightness, red, green, blue = _SLOT.unpack_from(self._memory.buf, offset)
+        if stored != sequence or _COUNT.unpack_from(self._memory.buf, offset)[0] != sequence:
+            return None  # overwritten while copying, the next frame will do
+        return sequence, captured, brightness, (red, green, blue)
+
+    def close(self) -> None:
+        """Detach, and free the memory on the creating side."""
+        self._memory.close()
+        if self._owner:
+            self._memory.unlink()
+
+
+def open_pcm(source: str):
+    """Return (read(n) -> bytes, realtime) for a file, pipe or UNIX socket."""
+    if source.startswith("unix:"):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(source[5:])
+        stream = sock.makefile("rb")
+        sock.close()  # the socket stays open until the file is closed
+        return stream, False
+    realtime = stat.S_ISREG(os.stat(source).st_mode)
+    return open(source, "rb"), realtime
+
+
+def _audio_worker(
+    source: str, ring_name: str, slots: int, sample_rate: int, fps: float, bands: int
+) -> int:
+    """Analyse PCM into frames until the source ends or a stop is requested.
+
+    Runs in the worker process; returns the number of frames written.
+    """
+    import numpy as np  # only the worker needs NumPy
+
+    ring = FrameRing(ring_name, slots)
+    hop = max(1, int(sample_rate / fps))
+    window_size = 1 << max(8, (2 * hop - 1).bit_length())
+    window = np.hanning(window_size).astype(np.float32)
+    frequencies = np.fft.rfftfreq(window_size, 1 / sample_rate)
+    # Log-spaced band edges as bin indexes for np.add.reduceat
+    edges = np.geomspace(MIN_FREQUENCY, sample_rate / 2, bands + 1)[:-1]
+    starts = np.unique(np.searchsorted(frequencies, edges))
+    counts = np.diff(np.append(starts, len(frequencies)))
+    samples = np.zeros(window_size, dtype=np.float32)
+    peaks = np.full(len(starts), 1e-9, dtype=np.float64)
+    written = 0
+
+    stream, realtime = open_pcm(source)
+    next_block = time.monotonic()
+    try:
+        while not ring.stopped:
+            data = stream.read(hop * 2)
+            if len(data) < 2:
+                break
+            captured = time.monotonic()
+            block = np.frombuffer(data[:len(data) // 2 * 2], dtype="<i2").astype(np.float32)
+            samples = np.roll(samples, -len(block))
+            samples[-len(block):] = block / 32768
+            power = np.abs(np.fft.rfft(samples * window)) ** 2
+            energy = np.add.reduceat(power, starts) / counts
+            # Automatic gain: each band is scaled to its slowly decaying peak
+            peaks = np.maximum(peaks * GAIN_DECAY, energy)
+            levels = np.sqrt(energy / peaks)
+            rgb = np.resize((levels * 255).astype(np.uint8), 3)
+            brightness = int(np.sqrt(levels.mean()) * 31)
+            ring.write(captured, brightness, tuple(int(value) for value in rgb))
+            written += 1
+            if realtime:
+                next_block += len(block) / sample_rate
+                if (delay := next_block - time.monotonic()) > 0:
+                    time.sleep(delay)
+    finally:
+        stream.close()
+        ring.close()
+    return written
+
+
+@dataclass(slots=True)
+class AudioMetrics:
+    """Counters of an audio-reactive session."""
+
+    frames_sent: int = 0
+    frames_dropped: int = 0
+    loop_lag_ms: Histogram = field(default_factory=lambda: Histogram(LATENCY_BUCKETS_MS))
+    latency_ms: Histogram = field(default_factory=lambda: Histogram(LATENCY_BUCKETS_MS))
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return all counters for diagnostics."""
+        return {
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "loop_lag_ms": self.loop_lag_ms.as_dict(),
+            "latency_ms": self.latency_ms.as_dict(),
+        }
+
+
+class AudioReactiveSource:
+    """Drives the brightness of controllers from an audio source.
+
+    ``loop_lag_ms`` measures how late each frame callback ran compared to
+    the frame period, ``latency_ms`` the time from reading a PCM block to
+    sending its frame.
+    """
+
+    def __init__(
+        self,
+        controllers: list[LedController],
+        source: str,
+        fps: float = DEFAULT_FPS,
+        sample_rate: int = DEFAULT_SAMPLE_RATE,
+        bands: int = DEFAULT_BANDS,
+        speed: int = 20,
+        executor: Executor | None = None,
+    ) -> None:
+        self._controllers = list(controllers)
+        self._source = source
+        self._fps = fps
+        self._sample_rate = sample_rate
+        self._bands = bands
+        self._speed = speed
+        self._clock = FrameClock(fps)
+        # Spawned, not forked: forking a threaded process is unsafe
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._ring: FrameRing | None = None
+        self._worker: asyncio.Future | None = None
+        self._unsubscribe = None
+        self._last_sequence = 0
+        self._last_frame_time: float | None = None
+        self.rgb = (0, 0, 0)
+        self.metrics = AudioMetrics()
+
+    def controls(self, controller: LedController) -> bool:
+        """Return True if the session drives ``controller``."""
+        return controller in self._controllers
+
+    @property
+    def controllers(self) -> list[LedController]:
+        """Return the controllers the session still drives."""
+        return list(self._controllers)
+
+    def release(self, controller: LedController) -> bool:
+        """Stop driving ``controller``; returns True if the session drove it.
+
+        The next frame no longer includes it, so a command sent to it is
+        not overwritten.
+        """
+        if controller not in self._controllers:
+            return False
+        self._controllers.remove(controller)
+        return True
+
+    @property
+    def running(self) -> bool:
+        """Return True while the worker is analysing audio."""
+        return self._worker is not None and not self._worker.done()
+
+    async def async_start(self) -> None:
+        """Start the worker process and the frame clock."""
+        if self.running:
+            return
+        try:
+            import numpy  # noqa: F401
+        except ImportError as err:
+            raise RuntimeError("Audio-reactive mode needs NumPy") from err
+        for controller in self._controllers:
+            if not controller.ready:
+                await controller.async_initialize()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn")
+            )
+        self._ring = FrameRing()
+        self._last_sequence = 0
+        self._last_frame_time = None
+        self._worker = asyncio.get_running_loop().run_in_executor(
+            self._executor,
+            _audio_worker,
+            self._source,
+            self._ring.name,
+            self._ring.slots,
+            self._sample_rate,
+            self._fps,
+            self._bands,
+        )
+        self._worker.add_done_callback(self._worker_done)
+        self._unsubscribe = self._clock.subscribe(self._async_send_frame)
+        _LOGGER.debug("Audio-reactive mode started on %s", self._source)
+
+    def _worker_done(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            return
+        if (err := future.exception()) is not None:
+            _LOGGER.error("Audio worker failed: %s", err)
+        else:
+            _LOGGER.debug("Audio source ended after %d frames", future.result())
+        self._stop_clock()
+
+    async def _async_send_frame(self, now: float) -> None:
+        if self._last_frame_time is not None:
+            late = now - self._last_frame_time - self._clock.period
+            self.metrics.loop_lag_ms.observe(max(0.0, late) * 1000)
+        self._last_frame_time = now
+        if self._ring is None or (frame := self._ring.read_latest()) is None:
+            return
+        sequence, captured, brightness, self.rgb = frame
+        if sequence == self._last_sequence:
+            return
+        if self._last_sequence and sequence > self._last_sequence + 1:
+            self.metrics.frames_dropped += sequence - self._last_sequence - 1
+        self._last_sequence = sequence
+        await async_send_burst(
+            [(controller, brightness, self._speed, True) for controller in self._controllers]
+        )
+        self.metrics.frames_sent += 1
+        self.metrics.latency_ms.observe((time.monotonic() - captured) * 1000)
+
+    def _stop_clock(self) -> None:
+        if self._unsubscribe:
+            self._unsubscribe()
+            self._unsubscribe = None
+
+    async def async_stop(self) -> None:
+        """Stop the worker, the clock and free the shared memory."""
+        self._stop_clock()
+        if self._ring is not None:
+            self._ring.request_stop()
+        if self._worker is not None:
+            try:
+                # A blocked pipe read only returns with the next block
+                await asyncio.wait_for(asyncio.shield(self._worker), 2)
+            except Exception:  # timeouts and worker errors alike
+                pass
+            self._worker = None
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
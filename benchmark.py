@@ -0,0 +1,165 @@
+"""Protocol benchmarks against the local emulator.
+
+Run with ``python -m <package>.benchmark``. Results can be written as JSON
+and compared with an earlier run to catch regressions before rollout.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from dataclasses import asdict, dataclass
+import json
+import statistics
+import sys
+import time
+
+from .controller import LedController
+from .discovery import H806SBDiscovery
+from .emulator import H806SBEmulator, NetworkConditions
+from .metrics import percentile
+from .transport import H806SBTransport
+
+
+@dataclass
+class BenchmarkResult:
+    """Figures of one benchmark run; higher commands/s, lower times are better."""
+
+    devices: int
+    commands_per_second: float
+    commands_delivered: float
+    send_latency_ms: float
+    discovery_ms: float
+    devices_discovered: int
+    availability_p50_ms: float
+    availability_p95_ms: float
+
+
+# Compared with a baseline: True if a larger value is better
+_HIGHER_IS_BETTER = {
+    "commands_per_second": True,
+    "send_latency_ms": False,
+    "discovery_ms": False,
+    "availability_p50_ms": False,
+    "availability_p95_ms": False,
+}
+
+
+async def _bench_commands(controllers: list[LedController], emulator: H806SBEmulator, rounds: int):
+    """Send ``rounds`` distinct commands to every controller."""
+    latencies = []
+    start = time.perf_counter()
+    for value in range(rounds):
+        for controller in controllers:
+            sent = time.perf_counter()
+            await controller.async_send_packet(brightness=value % 32, speed=1 + value % 100, is_on=True)
+            latencies.append(time.perf_counter() - sent)
+    elapsed = time.perf_counter() - start
+    # let the last datagrams arrive
+    await asyncio.sleep(0.05)
+    received = sum(len(device.commands) for device in emulator.devices)
+    total = rounds * len(controllers)
+    return total / elapsed, received / total, statistics.fmean(latencies) * 1000
+
+
+async def _bench_discovery(transport: H806SBTransport, emulator: H806SBEmulator, timeout: float):
+    """Time until every emulated device has been discovered."""
+    discovery = H806SBDiscovery(transport, broadcast_address=emulator.broadcast_address)
+    found = 0
+    start = time.perf_counter()
+    elapsed = timeout
+    async for _ in discovery.async_discover(timeout):
+        found += 1
+        if found == len(emulator.devices):
+            elapsed = time.perf_counter() - start
+            break
+    return elapsed * 1000, found
+
+
+async def _bench_availability(controllers: list[LedController], probes: int, timeout: float):
+    """Latency of async_check_availability, probes run one after another."""
+    latencies = []
+    for _ in range(probes):
+        for controller in controllers:
+            start = time.perf_counter()
+            if await controller.async_check_availability(timeout):
+                latencies.append((time.perf_counter() - start) * 1000)
+    return percentile(latencies, 0.5), percentile(latencies, 0.95)
+
+
+async def async_run_benchmark(
+    devices: int = 10,
+    rounds: int = 100,
+    probes: int = 10,
+    conditions: NetworkConditions | None = None,
+    timeout: float = 2.0,
+) -> BenchmarkResult:
+    """Run every benchmark against a fresh emulated fleet."""
+    async with H806SBEmulator(devices, conditions, seed=0) as emulator:
+        # A random listen port keeps the benchmark away from a running instance
+        transport = H806SBTransport(listen_port=0)
+        await transport.async_start()
+        controllers = []
+        for host, device in zip(emulator.hosts, emulator.devices):
+            controller = LedController(host, port=emulator.port, transport=transport, min_interval=0)
+            controller.set_serial_number(device.serial.hex())
+            controllers.append(controller)
+        try:
+            rate, delivered, send_latency = await _bench_commands(controllers, emulator, rounds)
+            discovery_ms, found = await _bench_discovery(transport, emulator, timeout)
+            p50, p95 = await _bench_availability(controllers, probes, timeout)
+        finally:
+            for controller in controllers:
+                await controller.async_close()
+            transport.close()
+    return BenchmarkResult(devices, rate, delivered, send_latency, discovery_ms, found, p50, p95)
+
+
+def compare(result: BenchmarkResult, baseline: dict, tolerance: float) -> list[str]:
+    """Return a description of every figure worse than baseline by more than tolerance."""
+    regressions = []
+    for key, higher_is_better in _HIGHER_IS_BETTER.items():
+        old, new = baseline.get(key), getattr(result, key)
+        if not old:
+            continue
+        change = (new - old) / old if higher_is_better else (old - new) / old
+        if change < -tolerance:
+            regressions.append(f"{key}: {old:.3f} -> {new:.3f} ({change:+.1%})")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="H806SB protocol benchmark")
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--probes", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0, help="reply latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--loss", type=float, default=0.0)
+    parser.add_argument("--reorder", type=float, default=0.0)
+    parser.add_argument("--json", metavar="FILE", help="write the result to FILE")
+    parser.add_argument("--baseline", metavar="FILE", help="fail on regressions against FILE")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    conditions = NetworkConditions(args.latency, args.jitter, args.loss, args.reorder)
+    result = asyncio.run(
+        async_run_benchmark(args.devices, args.rounds, args.probes, conditions)
+    )
+    for key, value in asdict(result).items():
+        print(f"{key:22} {value:.3f}" if isinstance(value, float) else f"{key:22} {value}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(asdict(result), file, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(result, json.load(file), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Persistent cache of the H806SB controllers seen on the network."""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import CACHE_MAX_AGE, CACHE_SAVE_DELAY, DOMAIN
+from .discovery import DiscoveredDevice
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_KEY = f"{DOMAIN}.devices"
+STORAGE_VERSION = 1
+
+
+class H806SBDeviceCache:
+    """Last known address of every controller, keyed by serial (hex).
+
+    Each record holds ``ip``, ``name``, ``last_seen`` (epoch seconds) and
+    ``rtt_ms`` of the last probe. The cache is fed by every reply on the
+    shared transport and written with a delay, so bursts of replies cost
+    one write.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize."""
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._devices: dict[str, dict[str, Any]] = {}
+
+    async def async_load(self) -> None:
+        """Load the records saved by the last run."""
+        data = await self._store.async_load() or {}
+        self._devices = data.get("devices", {})
+        _LOGGER.debug("Loaded %d cached device(s)", len(self._devices))
+
+    def get(self, serial: bytes) -> dict[str, Any] | None:
+        """Return the record of a device, None if it was never seen."""
+        return self._devices.get(serial.hex())
+
+    def recently_seen(self, serial: bytes) -> bool:
+        """Return True if the device answered within CACHE_MAX_AGE."""
+        return (record := self.get(serial)) is not None and _is_recent(record)
+
+    def devices(self, recent_only: bool = False) -> list[DiscoveredDevice]:
+        """Return the cached devices, most recently seen first.
+
+        With ``recent_only`` devices not seen within CACHE_MAX_AGE are left out.
+        """
+        records = sorted(self._devices.items(), key=lambda item: -item[1]["last_seen"])
+        return [
+            DiscoveredDevice(record["ip"], bytes.fromhex(serial), record["name"])
+            for serial, record in records
+            if not recent_only or _is_recent(record)
+        ]
+
+    @callback
+    def async_handle_reply(self, ip: str, name: str, serial: bytes) -> None:
+        """Record a reply seen by the shared transport."""
+        record = self._devices.setdefault(serial.hex(), {"rtt_ms": None})
+        record.update(ip=ip, name=name, last_seen=time.time())
+        self._async_schedule_save()
+
+    @callback
+    def async_note_rtt(self, serial: bytes, rtt_ms: float) -> None:
+        """Record the round trip time of the last probe of a device."""
+        if (record := self.get(serial)) is not None:
+            record["rtt_ms"] = round(rtt_ms, 3)
+            self._async_schedule_save()
+
+    @callback
+    def _async_schedule_save(self) -> None:
+        self._store.async_delay_save(lambda: {"devices": self._devices}, CACHE_SAVE_DELAY)
+
+
+def _is_recent(record: dict[str, Any]) -> bool:
+    return time.time() - record["last_seen"] < CACHE_MAX_AGE.total_seconds()
@@ -0,0 +1,96 @@
+"""Always-on capture of the datagrams exchanged with H806SB controllers.
+
+Recording a datagram stores one tuple in a fixed-size ring; nothing is
+formatted until the ring is exported as a pcap file, which Wireshark
+opens as raw IPv4/UDP.
+"""
+
+from __future__ import annotations
+
+from ipaddress import IPv4Address
+import struct
+import time
+
+from .codec import checksum
+
+DEFAULT_CAPTURE_SIZE = 2048
+
+PCAP_MAGIC = 0xA1B2C3D4
+LINKTYPE_RAW = 101  # packets start with the IP header
+_PCAP_HEADER = struct.Struct("<IHHiIII")
+_RECORD_HEADER = struct.Struct("<IIII")
+_IPV4_HEADER = struct.Struct("!BBHHHBBH4s4s")
+_UDP_HEADER = struct.Struct("!HHHH")
+_DONT_FRAGMENT = 0x4000
+_PROTO_UDP = 17
+
+
+class PacketCapture:
+    """Ring of the last ``size`` datagrams with monotonic timestamps."""
+
+    __slots__ = ("size", "count", "_ring", "_index", "_wall_offset")
+
+    def __init__(self, size: int = DEFAULT_CAPTURE_SIZE) -> None:
+        if size <= 0:
+            raise ValueError("Capture size must be positive")
+        self.size = size
+        self.count = 0
+        self._ring: list[tuple | None] = [None] * size
+        self._index = 0
+        # Converts monotonic timestamps to wall clock for the export
+        self._wall_offset = time.time() - time.monotonic()
+
+    def __len__(self) -> int:
+        return min(self.count, self.size)
+
+    def record(
+        self, outbound: bool, local: tuple[str, int], remote: tuple[str, int], data
+    ) -> None:
+        """Store one datagram; the data is copied, send buffers are reused."""
+        self._ring[self._index] = (time.monotonic(), outbound, local, remote, bytes(data))
+        self._index += 1
+        if self._index == self.size:
+            self._index = 0
+        self.count += 1
+
+    def packets(self) -> list[tuple[float, bool, tuple[str, int], tuple[str, int], bytes]]:
+        """Return the stored datagrams, oldest first."""
+        ring = self._ring[self._index:] + self._ring[:self._index]
+        return [packet for packet in ring if packet is not None]
+
+    def clear(self) -> None:
+        """Drop every stored datagram."""
+        self._ring = [None] * self.size
+        self._index = 0
+
+    def to_pcap(self) -> bytes:
+        """Export the stored datagrams as a pcap file."""
+        out = bytearray(_PCAP_HEADER.pack(PCAP_MAGIC, 2, 4, 0, 0, 0xFFFF, LINKTYPE_RAW))
+        for timestamp, outbound, local, remote, data in self.packets():
+            source, destination = (local, remote) if outbound else (remote, local)
+            packet = _encode_ipv4_udp(source, destination, data)
+            wall = timestamp + self._wall_offset
+            seconds = int(wall)
+            out += _RECORD_HEADER.pack(
+                seconds, int((wall - seconds) * 1_000_000), len(packet), len(packet)
+            )
+            out += packet
+        return bytes(out)
+
+
+def _packed_address(ip: str) -> bytes:
+    try:
+        return IPv4Address(ip).packed
+    except ValueError:
+        return bytes(4)
+
+
+def _encode_ipv4_udp(source: tuple[str, int], destination: tuple[str, int], data: bytes) -> bytes:
+    """Wrap a datagram in IPv4 and UDP headers (UDP checksum left at 0)."""
+    udp_length = _UDP_HEADER.size + len(data)
+    header = bytearray(_IPV4_HEADER.pack(
+        0x45, 0, _IPV4_HEADER.size + udp_length, 0, _DONT_FRAGMENT, 64, _PROTO_UDP, 0,
+        _packed_address(source[0]), _packed_address(destination[0]),
+    ))
+    struct.pack_into("!H", header, 10, checksum(header))
+    return bytes(header) + _UDP_HEADER.pack(source[1], destination[1], udp_length, 0) + data
@@ -0,0 +1,282 @@
+"""Command line tool for H806SB controllers, without Home Assistant.
+
+Run with ``python -m <package> <command>``:
+
+* ``discover`` lists the controllers answering a broadcast,
+* ``probe`` checks that controllers answer and shows their round trip time,
+* ``set`` sends one brightness and speed to many controllers in one burst,
+* ``bench`` measures the probe latency of controllers over several rounds.
+
+Targets are ``HOST`` or ``HOST=SERIAL``; ``@FILE`` reads one per line and
+``-`` reads them from stdin. Only the first field of a line counts, so the
+output of ``discover`` can be saved and used as a target file. ``set``
+probes targets given without a serial to learn it.
+
+All controllers share one socket and are handled concurrently, and only
+the protocol modules are imported, so a run starts in milliseconds and
+drives hundreds of controllers. ``__main__`` only imports this module:
+Python caches the bytecode of imported modules, not of ``__main__``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from typing import Any, NamedTuple
+
+from .codec import PROBE_PACKET
+from .controller import LedController, async_send_burst
+from .discovery import DEFAULT_UNICAST_RATE, H806SBDiscovery
+from .metrics import percentile
+from .transport import DEVICE_PORT, LISTEN_PORT, H806SBTransport
+
+DEFAULT_SPEED = 20
+
+
+class Target(NamedTuple):
+    """Controller given on the command line."""
+
+    host: str
+    serial: str | None  # hex, as in replies and config entries
+
+
+def parse_targets(values: list[str]) -> list[Target]:
+    """Expand ``@FILE`` and ``-`` and parse every target, dropping duplicates."""
+    lines: list[str] = []
+    for value in values:
+        if value == "-":
+            lines.extend(sys.stdin)
+        elif value.startswith("@"):
+            with open(value[1:], encoding="utf-8") as file:
+                lines.extend(file)
+        else:
+            lines.append(value)
+    targets: dict[str, Target] = {}
+    for line in lines:
+        if not (fields := line.split("#", 1)[0].split()):
+            continue
+        host, _, serial = fields[0].partition("=")
+        if serial:
+            bytes.fromhex(serial)  # raises ValueError on a malformed serial
+        targets[host] = Target(host, serial.lower() or None)
+    return list(targets.values())
+
+
+def _emit(args: argparse.Namespace, record: dict[str, Any], text: str) -> None:
+    print(json.dumps(record) if args.json else text, flush=True)
+
+
+async def _async_probe(
+    transport: H806SBTransport, target: Target, port: int, timeout: float
+) -> tuple[float | None, tuple[str, bytes] | None]:
+    """Return (rtt_ms, (name, serial)) of one probe, (None, None) without reply."""
+    serial = int.from_bytes(bytes.fromhex(target.serial), "big") if target.serial else None
+    start = time.perf_counter()
+    reply = await transport.async_request(
+        PROBE_PACKET, (target.host, port), serial=serial, timeout=timeout
+    )
+    if reply is None:
+        return None, None
+    return (time.perf_counter() - start) * 1000, reply
+
+
+async def _async_discover(args: argparse.Namespace, transport: H806SBTransport) -> int:
+    addresses = args.broadcast or [H806SBDiscovery.BROADCAST_ADDRESS]
+    discovery = H806SBDiscovery(transport, addresses[0], addresses[1:], args.subnet, args.rate)
+    discovery.DEVICE_PORT = args.port
+    found = 0
+    async for device in discovery.async_discover(args.timeout):
+        found += 1
+        serial = device.serial.hex()
+        _emit(
+            args,
+            {"host": device.ip, "serial": serial, "name": device.name},
+            f"{device.ip}={serial}\t{device.name}",
+        )
+    return 0 if found else 1
+
+
+async def _async_probe_targets(args: argparse.Namespace, transport: H806SBTransport) -> int:
+    results = await asyncio.gather(
+        *(_async_probe(transport, target, args.port, args.timeout) for target in args.targets)
+    )
+    failed = 0
+    for target, (rtt, reply) in zip(args.targets, results):
+        if reply is None:
+            failed += 1
+            _emit(args, {"host": target.host, "available": False}, f"{target.host}\tno reply")
+            continue
+        name, serial = reply
+        _emit(
+            args,
+            {
+                "host": target.host,
+                "available": True,
+                "serial": serial.hex(),
+                "name": name,
+                "rtt_ms": round(rtt, 3),
+            },
+            f"{target.host}={serial.hex()}\t{name}\t{rtt:.1f} ms",
+        )
+    return 1 if failed else 0
+
+
+async def _async_set(args: argparse.Namespace, transport: H806SBTransport) -> int:
+    # Control packets carry the serial, learn the missing ones in one round
+    unknown = [target for target in args.targets if target.serial is None]
+    replies = await asyncio.gather(
+        *(_async_probe(transport, target, args.port, args.timeout) for target in unknown)
+    )
+    learned = {
+        target.host: reply[1].hex() for target, (_, reply) in zip(unknown, replies) if reply
+    }
+
+    failed = 0
+    controllers: list[LedController] = []
+    for target in args.targets:
+        if (serial := target.serial or learned.get(target.host)) is None:
+            failed += 1
+            _emit(args, {"host": target.host, "sent": False}, f"{target.host}\tno reply, serial unknown")
+            continue
+        # Through the shared socket only: one file descriptor for any number of hosts
+        controller = LedController(target.host, args.port, transport, min_interval=0, connect=False)
+        controller.set_serial_number(serial)
+        controllers.append(controller)
+
+    is_on = not args.off
+    if args.reliable:
+        results = await asyncio.gather(
+            *(
+                controller.async_send_packet(args.brightness, args.speed, is_on, reliable=True)
+                for controller in controllers
+            )
+        )
+    else:
+        skew = await async_send_burst(
+            [(controller, args.brightness, args.speed, is_on) for controller in controllers]
+        )
+        logging.getLogger(__name__).debug("Burst skew %.3f ms", skew * 1000)
+        results = [not controller.metrics.send_errors for controller in controllers]
+
+    status = "confirmed" if args.reliable else "sent"
+    for controller, ok in zip(controllers, results):
+        failed += not ok
+        _emit(
+            args,
+            {"host": controller.host, "sent": ok},
+            f"{controller.host}\t{status if ok else 'failed'}",
+        )
+        await controller.async_close()
+    return 1 if failed else 0
+
+
+async def _async_bench(args: argparse.Namespace, transport: H806SBTransport) -> int:
+    rtts: dict[str, list[float]] = {target.host: [] for target in args.targets}
+    for round_number in range(args.count):
+        if round_number:
+            await asyncio.sleep(args.interval)
+        results = await asyncio.gather(
+            *(_async_probe(transport, target, args.port, args.timeout) for target in args.targets)
+        )
+        for target, (rtt, _) in zip(args.targets, results):
+            if rtt is not None:
+                rtts[target.host].append(rtt)
+
+    silent = 0
+    for host, values in [*rtts.items(), ("all", [rtt for values in rtts.values() for rtt in values])]:
+        probes = args.count * (len(args.targets) if host == "all" else 1)
+        silent += host != "all" and not values
+        record = {
+            "host": host,
+            "probes": probes,
+            "replies": len(values),
+            "loss": round(1 - len(values) / probes, 4) if probes else 0.0,
+            "p50_ms": round(percentile(values, 0.5), 3) if values else None,
+            "p95_ms": round(percentile(values, 0.95), 3) if values else None,
+            "max_ms": round(max(values), 3) if values else None,
+        }
+        text = (
+            f"{host}\t{len(values)}/{probes}\tp50 {record['p50_ms']} ms"
+            f"\tp95 {record['p95_ms']} ms\tmax {record['max_ms']} ms"
+        )
+        _emit(args, record, text)
+    return 1 if silent else 0
+
+
+async def _async_run(args: argparse.Namespace) -> int:
+    transport = H806SBTransport(args.listen_port)
+    await transport.async_start()
+    try:
+        return await args.handler(args, transport)
+    finally:
+        transport.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--port", type=int, default=DEVICE_PORT, help="device UDP port")
+    common.add_argument(
+        "--listen-port", type=int, default=LISTEN_PORT, help="local UDP port, 0 for any"
+    )
+    common.add_argument("--timeout", type=float, default=1.0, help="reply timeout in seconds")
+    common.add_argument("--json", action="store_true", help="print one JSON object per line")
+    common.add_argument("-v", "--verbose", action="store_true", help="log debug messages")
+
+    parser = argparse.ArgumentParser(
+        prog=f"python -m {__package__}", description="H806SB controller tool"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    target_help = "HOST, HOST=SERIAL, @FILE or - for stdin"
+
+    discover = commands.add_parser("discover", parents=[common], help="find controllers")
+    discover.add_argument(
+        "--broadcast", action="append", default=[], metavar="ADDRESS",
+        help="broadcast address (repeatable, default 255.255.255.255)",
+    )
+    discover.add_argument(
+        "--subnet", action="append", default=[], metavar="CIDR",
+        help="subnet to sweep with unicast probes (repeatable)",
+    )
+    discover.add_argument(
+        "--rate", type=float, default=DEFAULT_UNICAST_RATE, help="unicast probes per second"
+    )
+    discover.set_defaults(handler=_async_discover, timeout=2.0)
+
+    probe = commands.add_parser("probe", parents=[common], help="check that controllers answer")
+    probe.add_argument("targets", nargs="+", metavar="TARGET", help=target_help)
+    probe.set_defaults(handler=_async_probe_targets)
+
+    set_ = commands.add_parser("set", parents=[common], help="set brightness and speed")
+    set_.add_argument("targets", nargs="+", metavar="TARGET", help=target_help)
+    set_.add_argument("--brightness", type=int, required=True, metavar="0-31")
+    set_.add_argument("--speed", type=int, default=DEFAULT_SPEED, metavar="1-100")
+    set_.add_argument("--off", action="store_true", help="turn the playback off")
+    set_.add_argument(
+        "--reliable", action="store_true", help="confirm each command, retransmit if needed"
+    )
+    set_.set_defaults(handler=_async_set)
+
+    bench = commands.add_parser("bench", parents=[common], help="measure probe latency")
+    bench.add_argument("targets", nargs="+", metavar="TARGET", help=target_help)
+    bench.add_argument("--count", type=int, default=20, help="probes per controller")
+    bench.add_argument(
+        "--interval", type=float, default=0.05, help="pause between rounds in seconds"
+    )
+    bench.set_defaults(handler=_async_bench)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    if "targets" in args:
+        try:
+            args.targets = parse_targets(args.targets)
+        except (OSError, ValueError) as err:
+            parser.error(f"invalid targets: {err}")
+    try:
+        return asyncio.run(_async_run(args))
+    except KeyboardInterrupt:
+        return 130
+
@@ -0,0 +1,167 @@
+"""Encoding and decoding of H806SB packets.
+
+Control packets (``FB C1``) are encoded into one preallocated buffer per
+device, so sending a command does not allocate. Replies (``AB 02``) are
+decoded through a memoryview without copying the datagram.
+"""
+
+from __future__ import annotations
+
+from array import array
+import struct
+import sys
+from typing import NamedTuple, Optional, Tuple
+
+CONTROL_HEADER = bytes([0xFB, 0xC1])
+DISCOVERY_PACKET = bytes([0xAB, 0x01])
+RESPONSE_HEADER = bytes([0xAB, 0x02])
+
+# Unicast availability probe, format taken from a capture of the vendor app
+PROBE_PACKET = bytes([
+    0xAB, 0x01, 0x00, 0x02,  # Header
+    0x00, 0x00, 0x00, 0x00,  # Reserved bytes
+    0x00, 0x00, 0x00, 0x00,  # Serial number
+])
+
+MODE_OFF = 0x00
+MODE_SINGLE_FILE = 0x01  # Single file playback
+
+# FB C1 | counter | speed | brightness | mode | 00 AE | 4 x 00 | serial (LE)
+CONTROL_STRUCT = struct.Struct("<2sBBBB2s4s4s")
+# counter, speed, brightness and mode are the only bytes that change per command
+_COMMAND_STRUCT = struct.Struct("<BBBB")
+_COMMAND_OFFSET = 2
+_SERIAL_OFFSET = 12
+_UNKNOWN = bytes([0x00, 0xAE])
+_CONSTANT = bytes(4)
+
+CONTROL_SIZE = CONTROL_STRUCT.size
+
+# EXPERIMENTAL live pixel data, modelled on the control packet: FB C2 |
+# frame counter | chunk index | pixel byte offset (BE) | payload length (BE)
+# | serial (LE), followed by RGB bytes. Not yet verified against a capture
+# of the vendor app; only sent when a pixel stream is started explicitly.
+STREAM_HEADER = bytes([0xFB, 0xC2])
+STREAM_STRUCT = struct.Struct(">2sBBHH4s")
+STREAM_HEADER_SIZE = STREAM_STRUCT.size
+_STREAM_COUNTER_STRUCT = struct.Struct("B")
+
+
+class ControlCommand(NamedTuple):
+    """Fields of a decoded control packet."""
+
+    counter: int
+    speed: int
+    brightness: int
+    mode: int
+    serial: bytes
+
+
+class ControlTemplate:
+    """Prebuilt control packet of one device, re-encoded in place."""
+
+    __slots__ = ("buffer",)
+
+    def __init__(self, serial: bytes = bytes(4)) -> None:
+        self.buffer = bytearray(CONTROL_SIZE)
+        CONTROL_STRUCT.pack_into(
+            self.buffer, 0, CONTROL_HEADER, 0, 0x20, 0, MODE_SINGLE_FILE,
+            _UNKNOWN, _CONSTANT, serial,
+        )
+
+    def set_serial(self, serial: bytes) -> None:
+        """Store the 4-byte little-endian serial in the template."""
+        self.buffer[_SERIAL_OFFSET:_SERIAL_OFFSET + 4] = serial
+
+    def encode(self, counter: int, speed: int, brightness: int, mode: int) -> bytearray:
+        """Write the command fields and return the (reused) buffer.
+
+        The caller has to hand the buffer to the socket before encoding the
+        next command of the same device.
+        """
+        _COMMAND_STRUCT.pack_into(self.buffer, _COMMAND_OFFSET, counter, speed, brightness, mode)
+        return self.buffer
+
+
+class StreamChunk(NamedTuple):
+    """Header fields of a decoded pixel datagram."""
+
+    counter: int
+    index: int
+    offset: int
+    length: int
+    serial: bytes
+
+
+def encode_stream_header(
+    buffer: bytearray, position: int, index: int, offset: int, length: int, serial: bytes
+) -> None:
+    """Write a pixel datagram header into ``buffer`` at ``position``."""
+    STREAM_STRUCT.pack_into(buffer, position, STREAM_HEADER, 0, index, offset, length, serial)
+
+
+def set_stream_counter(buffer: bytearray, position: int, counter: int) -> None:
+    """Update the frame counter of the header at ``position``."""
+    _STREAM_COUNTER_STRUCT.pack_into(buffer, position + 2, counter)
+
+
+def decode_stream(packet: bytes) -> Optional[Tuple[StreamChunk, memoryview]]:
+    """Decode a pixel datagram into its header and a view of the RGB payload."""
+    if len(packet) < STREAM_HEADER_SIZE or packet[:2] != STREAM_HEADER:
+        return None
+    _, counter, index, offset, length, serial = STREAM_STRUCT.unpack_from(packet)
+    payload = memoryview(packet)[STREAM_HEADER_SIZE:STREAM_HEADER_SIZE + length]
+    return StreamChunk(counter, index, offset, length, serial), payload
+
+
+def decode_control(packet: bytes) -> Optional[ControlCommand]:
+    """Decode a control packet, None if it is not one."""
+    if len(packet) < CONTROL_SIZE or packet[:2] != CONTROL_HEADER:
+        return None
+    _, counter, speed, brightness, mode, _, _, serial = CONTROL_STRUCT.unpack_from(packet)
+    return ControlCommand(counter, speed, brightness, mode, serial)
+
+
+def serial_to_wire(serial: bytes) -> bytes:
+    """Convert a big-endian serial (as in replies) to the 4-byte wire format.
+
+    Example:
+        0c 39 51 -> filled to "00 0c 39 51" -> reversed to "51 39 0c 00"
+    """
+    if len(serial) > 4:
+        raise ValueError(f"Serial number too long: {serial.hex()}")
+    return int.from_bytes(serial, "big").to_bytes(4, "little")
+
+
+def encode_reply(name: str) -> bytes:
+    """Encode an ``AB 02`` reply carrying ``<name>_<serial>``."""
+    return RESPONSE_HEADER + name.encode("ascii") + b"\x00"
+
+
+def decode_reply(data: bytes) -> Optional[Tuple[str, bytes]]:
+    """Decode an ``AB 02 <name>_<serial>`` reply into (name, serial)."""
+    if data[:2] != RESPONSE_HEADER:
+        return None
+    end = data.find(b"\x00", 2)
+    view = memoryview(data)[2:end if end >= 0 else len(data)]
+    name = str(view, "ascii", "ignore")
+    _, sep, hex_part = name.partition("_")
+    if not sep:
+        return None
+    try:
+        return name, bytes.fromhex(hex_part)
+    except ValueError:
+        return None
+
+
+def checksum(data: bytes) -> int:
+    """Ones' complement sum of the big-endian 16-bit words of ``data``."""
+    if len(data) % 2:
+        data = bytes(data) + b"\x00"
+    words = array("H", data)
+    if sys.byteorder == "little":
+        words.byteswap()
+    total = sum(words)
+    while total >> 16:
+        total = (total >> 16) + (total & 0xFFFF)
+    return ~total & 0xFFFF
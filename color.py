@@ -0,0 +1,111 @@
+"""Colour pipeline: gamma, white balance and 5-bit brightness tables.
+
+Every table is computed once per set of options and cached, so applying
+the pipeline is a table lookup per channel. Whole pixel buffers are
+mapped with NumPy when it is installed and with ``bytes.translate``
+otherwise; both run the lookup in C.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import NamedTuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+DEVICE_BRIGHTNESS_MAX = 31
+
+DEFAULT_GAMMA = 2.2
+DEFAULT_BRIGHTNESS_GAMMA = 1.8
+DEFAULT_STRIP_TYPE = "neutral"
+
+# Per-channel (R, G, B) trims that bring common strips to a neutral white
+STRIP_WHITE_BALANCE: dict[str, tuple[float, float, float]] = {
+    "neutral": (1.0, 1.0, 1.0),
+    "ws2811": (1.0, 0.9, 0.85),
+    "ws2812b": (1.0, 0.85, 0.75),
+    "sk6812": (1.0, 0.9, 0.8),
+}
+
+
+_CHANNELS = np.arange(3) if np is not None else None
+
+
+class ColorTables(NamedTuple):
+    """Lookup tables of one set of pipeline options."""
+
+    red: bytes
+    green: bytes
+    blue: bytes
+    brightness: bytes
+
+
+def _channel_table(gamma: float, trim: float) -> bytes:
+    return bytes(round(255 * trim * (value / 255) ** gamma) for value in range(256))
+
+
+def _brightness_table(gamma: float) -> bytes:
+    """Map 8-bit HA brightness to the device's 0-31 scale.
+
+    The curve follows perceived brightness, and every non-zero input keeps
+    at least level 1 so a dimmed light never turns off.
+    """
+    table = bytearray(256)
+    for value in range(1, 256):
+        level = round(DEVICE_BRIGHTNESS_MAX * (value / 255) ** gamma)
+        table[value] = max(1, level)
+    return bytes(table)
+
+
+@lru_cache(maxsize=16)
+def build_tables(gamma: float, strip_type: str, brightness_gamma: float) -> ColorTables:
+    """Return the (cached) tables of one set of options."""
+    trims = STRIP_WHITE_BALANCE.get(strip_type, STRIP_WHITE_BALANCE[DEFAULT_STRIP_TYPE])
+    return ColorTables(
+        *(_channel_table(gamma, trim) for trim in trims),
+        _brightness_table(brightness_gamma),
+    )
+
+
+class ColorPipeline:
+    """Applies the tables of one set of options to colours and pixel buffers."""
+
+    def __init__(
+        self,
+        gamma: float = DEFAULT_GAMMA,
+        strip_type: str = DEFAULT_STRIP_TYPE,
+        brightness_gamma: float = DEFAULT_BRIGHTNESS_GAMMA,
+    ) -> None:
+        self.tables = build_tables(float(gamma), strip_type, float(brightness_gamma))
+        self._np_tables = None
+        if np is not None:
+            self._np_tables = np.frombuffer(
+                b"".join(self.tables[:3]), dtype=np.uint8
+            ).reshape(3, 256)
+
+    def device_brightness(self, brightness: int) -> int:
+        """Convert HA brightness (0-255) to the device scale (0-31)."""
+        return self.tables.brightness[max(0, min(255, int(brightness)))]
+
+    def color(self, rgb: tuple[int, int, int]) -> tuple[int, int, int]:
+        """Correct a single colour."""
+        red, green, blue = rgb
+        return self.tables.red[red], self.tables.green[green], self.tables.blue[blue]
+
+    def apply(self, frame) -> bytearray:
+        """Correct a buffer of RGB pixels, returning a new buffer."""
+        source = memoryview(frame).cast("B")
+        if source.nbytes % 3:
+            raise ValueError("Pixel buffer length must be a multiple of 3")
+        if self._np_tables is not None:
+            pixels = np.frombuffer(source, dtype=np.uint8).reshape(-1, 3)
+            # out[i, c] = tables[c, pixels[i, c]] in one vectorized lookup
+            return bytearray(self._np_tables[_CHANNELS, pixels])
+        data = source.tobytes()
+        out = bytearray(len(data))
+        for channel, table in enumerate(self.tables[:3]):
+            out[channel::3] = data[channel::3].translate(table)
+        return out
@@ -4,16 +4,30 @@ from homeassistant.helpers.selector import selector, SelectOptionDict
 
 import voluptuous as vol
 import logging
+from contextlib import aclosing
 
-from .discovery import H806SBDiscovery
-from .controller import LedController
+from .integration import async_get_discovery, async_scan_devices
 from .const import (
     DOMAIN, 
     CONFIG_VERSION, 
+    DATA_CACHE,
     CONF_ACTION,
     CONF_AUTO_DISCOVERY,
     CONF_MANUAL_SETUP,
+    CONF_BRIGHTNESS_GAMMA,
+    CONF_GAMMA,
+    CONF_MISS_THRESHOLD,
+    CONF_SEND_INTERVAL,
+    CONF_STRIP_TYPE,
+    DEFAULT_MISS_THRESHOLD,
+    DEFAULT_SEND_INTERVAL,
     )
+from .color import (
+    DEFAULT_BRIGHTNESS_GAMMA,
+    DEFAULT_GAMMA,
+    DEFAULT_STRIP_TYPE,
+    STRIP_WHITE_BALANCE,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -36,10 +50,10 @@ class H806SBFlowHandler(config_entries.ConfigFlow):
 
     @staticmethod
     @callback
-    def async_get_option_flow(config_entry):
+    def async_get_options_flow(config_entry):
         """H806SB option callback."""
         _LOGGER.debug(f"GetOptionFlow:{config_entry}")
-        return H806SBOptionsFlowHandler(config_entry)
+        return H806SBOptionsFlowHandler()
 
     async def async_step_user(self, user_input=None):
         """Handle a flow initialized by the user."""
@@ -72,16 +86,19 @@ class H806SBFlowHandler(config_entries.ConfigFlow):
         if not device:
             return self.async_abort(reason="no_devices_found")
 
-        controller = LedController(host=device["ip"])
-        
-        try:
-            await self.async_set_unique_id(device["serial"])
-            self._abort_if_unique_id_configured()
-            # memorizing for future step
-            self.discovered_device = device
-            return await self.async_step_confirm()
-        finally:
-            await controller.async_close()
+        await self.async_set_unique_id(device["serial"])
+        self._abort_if_unique_id_configured()
+        # memorizing for future step
+        self.discovered_device = device
+        return await self.async_step_confirm()
+
+    async def async_step_integration_discovery(self, discovery_info):
+        """Device found by the background discovery."""
+        await self.async_set_unique_id(discovery_info["serial"])
+        self._abort_if_unique_id_configured(updates={"host": discovery_info["ip"]})
+        self.discovered_device = discovery_info
+        self.context["title_placeholders"] = {"name": discovery_info["name"]}
+        return await self.async_step_confirm()
 
     async def async_step_confirm(self, user_input=None):
         """Confirming the addition of a newly discovered device."""
@@ -135,25 +152,65 @@ class H806SBFlowHandler(config_entries.ConfigFlow):
 
 
     async def async_discover_devices(self):
-        """Discover devices."""
-        discovery = H806SBDiscovery()
+        """Discover the first device that is not configured yet."""
+        discovery = await async_get_discovery(self.hass)
+        configured = self._async_current_ids()
+        if (cache := self.hass.data.get(DATA_CACHE)) is not None:
+            # Stale records may be unplugged or replaced devices
+            for device in cache.devices(recent_only=True):
+                if device.serial.hex() in configured:
+                    continue
+                # Offer the cached device at once; the rescan refreshes the
+                # cache and starts discovery flows for everything it finds
+                _LOGGER.debug(f"Cached device: {device.name} (IP: {device.ip})")
+                self.hass.async_create_background_task(
+                    async_scan_devices(self.hass), f"{DOMAIN}_rescan"
+                )
+                return {"ip": device.ip, "serial": device.serial.hex(), "name": device.name}
         try:
-            device = await discovery.discover_device()
-            if device:
-                ip, serial, name = device
-                _LOGGER.debug(f"Device found: {name} (IP: {ip})")
-                return {"ip": ip, "serial": serial.hex(), "name": name}
+            async with aclosing(discovery.async_discover()) as devices:
+                async for device in devices:
+                    if device.serial.hex() in configured:
+                        continue
+                    _LOGGER.debug(f"Device found: {device.name} (IP: {device.ip})")
+                    return {"ip": device.ip, "serial": device.serial.hex(), "name": device.name}
             _LOGGER.warning("No device found during discovery")
         except Exception as e:
             _LOGGER.error(f"Discovery error:{e}", exc_info=True)
-        finally:
-            if discovery:
-                discovery.close()
         return None
 
 class H806SBOptionsFlowHandler(config_entries.OptionsFlow):
-    """Option flow for OpenRGB component."""
+    """Option flow for H806SB component."""
     
     async def async_step_init(self, user_input=None):
         """Manage the options."""
-        return await self.async_step_user()
\ No newline at end of file
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        # Options are merged into the entry data on setup
+        config = {**self.config_entry.data, **self.config_entry.options}
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema({
+                vol.Required(
+                    CONF_SEND_INTERVAL,
+                    default=config.get(CONF_SEND_INTERVAL, DEFAULT_SEND_INTERVAL),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=1)),
+                vol.Required(
+                    CONF_MISS_THRESHOLD,
+                    default=config.get(CONF_MISS_THRESHOLD, DEFAULT_MISS_THRESHOLD),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=20)),
+                vol.Required(
+                    CONF_STRIP_TYPE,
+                    default=config.get(CONF_STRIP_TYPE, DEFAULT_STRIP_TYPE),
+                ): vol.In(list(STRIP_WHITE_BALANCE)),
+                vol.Required(
+                    CONF_GAMMA,
+                    default=config.get(CONF_GAMMA, DEFAULT_GAMMA),
+                ): vol.All(vol.Coerce(float), vol.Range(min=1, max=3)),
+                vol.Required(
+                    CONF_BRIGHTNESS_GAMMA,
+                    default=config.get(CONF_BRIGHTNESS_GAMMA, DEFAULT_BRIGHTNESS_GAMMA),
+                ): vol.All(vol.Coerce(float), vol.Range(min=1, max=3)),
+            }),
+        )
\ No newline at end of file
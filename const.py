@@ -3,9 +3,69 @@
 from datetime import timedelta
 
 DOMAIN = "h806sb"
-CONFIG_VERSION = 1
+CONFIG_VERSION = 2
+
+# hass.data key of the UDP transport shared by all entries
+DATA_TRANSPORT = f"{DOMAIN}_transport"
+# hass.data key of the availability sweep shared by all entries
+DATA_SWEEP = f"{DOMAIN}_sweep"
+# hass.data key of the transition engine shared by all lights
+DATA_TRANSITIONS = f"{DOMAIN}_transitions"
+# hass.data key of the effect engine shared by all lights
+DATA_EFFECTS = f"{DOMAIN}_effects"
+# hass.data key of the persistent device cache
+DATA_CACHE = f"{DOMAIN}_cache"
+# hass.data key of the running audio-reactive session
+DATA_AUDIO = f"{DOMAIN}_audio"
+# hass.data key of the running pixel streams, by controller
+DATA_STREAMS = f"{DOMAIN}_streams"
+# hass.data key of the extra subnets swept by discovery
+DATA_SUBNETS = f"{DOMAIN}_subnets"
 
 TRACK_INTERVAL = timedelta(seconds=60)
+# own probes back off up to this interval while a device keeps answering
+MAX_POLL_INTERVAL = timedelta(minutes=10)
+# re-probe interval after a miss, spread by +/- PROBE_JITTER
+FAST_PROBE_INTERVAL = timedelta(seconds=5)
+PROBE_JITTER = 0.3
+# consecutive misses before a device is reported unavailable
+CONF_MISS_THRESHOLD = "miss_threshold"
+DEFAULT_MISS_THRESHOLD = 3
+# after this many misses in a row a broadcast looks for the serial at a new address
+RESOLVE_AFTER_MISSES = 2
+# how long the re-resolve broadcast waits for the device (seconds)
+RESOLVE_WINDOW = 1.0
+DISCOVERY_INTERVAL = timedelta(minutes=15)
+CONF_EXTRA_SUBNETS = "extra_subnets"
+# how long the availability sweep collects replies to its broadcast (seconds)
+SWEEP_WINDOW = 2.0
+# entries seen more recently come up from the cache without waiting for a probe
+CACHE_MAX_AGE = timedelta(days=7)
+# delay before cache changes are written to disk (seconds)
+CACHE_SAVE_DELAY = 30
+
+# minimum pause between two control packets sent to one controller (seconds)
+CONF_SEND_INTERVAL = "send_interval"
+DEFAULT_SEND_INTERVAL = 0.05
+
+# reliable commands: status probe timeout and retransmissions before giving up
+DEFAULT_ACK_TIMEOUT = 0.5
+DEFAULT_MAX_RETRIES = 3
+# weight of the newest sample in the moving average of the loss rate
+LOSS_SMOOTHING = 0.2
+
+# colour pipeline options
+CONF_GAMMA = "gamma"
+CONF_BRIGHTNESS_GAMMA = "brightness_gamma"
+CONF_STRIP_TYPE = "strip_type"
+
+# services
+SERVICE_EXPORT_CAPTURE = "export_capture"
+SERVICE_START_AUDIO = "start_audio_reactive"
+SERVICE_STOP_AUDIO = "stop_audio_reactive"
+SERVICE_START_STREAM = "start_pixel_stream"
+SERVICE_STOP_STREAM = "stop_pixel_stream"
+CONF_SOURCE = "source"
 
 # config flow
 CONF_ACTION = "discovery"
@@ -1,31 +1,118 @@
+from __future__ import annotations
+
 import asyncio
-import socket
 import logging
+import time
 from ipaddress import ip_address
 
+from .codec import MODE_OFF, MODE_SINGLE_FILE, PROBE_PACKET, ControlTemplate, serial_to_wire
+from .const import (
+    DEFAULT_ACK_TIMEOUT,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_SEND_INTERVAL,
+    LOSS_SMOOTHING,
+)
+from .metrics import ControllerMetrics
+from .transport import DEVICE_PORT, H806SBDeviceChannel, H806SBTransport
+
 _LOGGER = logging.getLogger(__name__)
 
+async def async_send_burst(
+    commands: list[tuple[LedController, int, int, bool]],
+) -> float:
+    """Send one command to each controller in a single tight burst.
+
+    Every packet is built before the first one leaves, so the time between
+    the first and the last send only covers the sendto calls. Commands
+    queued on a controller are superseded by the burst.
+
+    Returns the skew between the first and last send in seconds.
+    """
+    for controller, *_ in commands:
+        if not controller.ready:
+            await controller.async_initialize()
+
+    # Packets are encoded into each controller's own buffer, so a controller
+    # may only appear once per burst: the last command for it wins
+    latest = {controller: command for controller, *command in commands}
+    prepared = []
+    for controller, (brightness, speed, is_on) in latest.items():
+        state = controller._clamp_state(brightness, speed, is_on)
+        prepared.append((controller, state, controller._build_packet(state)))
+
+    sent = []
+    first = last = time.perf_counter()
+    for controller, state, packet in prepared:
+        try:
+            controller._write(packet)
+            sent.append(True)
+        except Exception as err:
+            _LOGGER.error("Error sending UDP packet to %s: %s", controller._host, err)
+            controller.metrics.send_errors += 1
+            sent.append(False)
+        last = time.perf_counter()
+
+    for (controller, state, _), ok in zip(prepared, sent):
+        if ok:
+            controller._mark_sent(state)
+        controller._supersede_pending(ok)
+
+    skew = last - first
+    _LOGGER.debug("Burst to %d controllers, skew %.3f ms", len(prepared), skew * 1000)
+    return skew
+
 class LedController:
     """LED control device by using UDP for Home Assistant."""
     
-    def __init__(self, host: str, port: int = 4626):
+    def __init__(
+        self,
+        host: str,
+        port: int = DEVICE_PORT,
+        transport: H806SBTransport | None = None,
+        min_interval: float = DEFAULT_SEND_INTERVAL,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        ack_timeout: float = DEFAULT_ACK_TIMEOUT,
+        connect: bool = True,
+    ):
         self._host = host
         self._port = port
         self._command_counter = 0
-        self._udp_socket = None
+        self._transport = transport
+        self._owns_transport = transport is None
+        # Connected socket for sends, opened by async_initialize; without
+        # ``connect`` every send goes through the shared socket (one file
+        # descriptor for any number of devices, e.g. in the command line tool)
+        self._connect = connect
+        self._channel: H806SBDeviceChannel | None = None
+        self._init_lock = asyncio.Lock()
         self._serial_number = bytearray([0]*4)
-        
-        # base packet
-        self._base_packet = bytearray([
-            0xFB, 0xC1,              # Command bytes
-            0x00,                    # Counter (will be increased)
-            0x20,                    # Speed (by default 80)
-            0x00,                    # Brightness (by default 0)
-            0x01,                    # Single file playback
-            0x00, 0xAE,              # Unknown bytes
-            0x00, 0x00, 0x00, 0x00,  # Constants as serial number
-            0x00, 0x00, 0x00, 0x00   # Serial number (will be filling after discovery)
-        ])
+        # Serial number as carried in device replies (None until known)
+        self._expected_serial: int | None = None
+        # Control packet of this device, re-encoded in place for every command
+        self._template = ControlTemplate()
+        self.metrics = ControllerMetrics()
+        # Round trip time of the last answered probe
+        self.last_rtt_ms: float | None = None
+        # Last pixel frame sent, the base of delta updates (see stream.py)
+        self.pixel_shadow: bytearray | None = None
+
+        # Command queue: only the newest state waits for the next send slot
+        self._min_interval = min_interval
+        self._pending_state: tuple[int, int, bool] | None = None
+        self._pending_waiters: list[asyncio.Future] = []
+        self._last_sent_state: tuple[int, int, bool] | None = None
+        self._last_send_time = 0.0
+        self._priority = asyncio.Event()
+        self._sender: asyncio.Task | None = None
+
+        # Reliable delivery: the counter byte is the sequence number, a
+        # command is confirmed by a status probe answered after it was sent
+        self._max_retries = max_retries
+        self._ack_timeout = ack_timeout
+        self._pending_reliable = False
+        self._last_sent_confirmed = False
+        # Moving average of the probe loss, stretches the send interval
+        self.loss_rate = 0.0
 
     @staticmethod
     def compare_ips(ip1: str, ip2: str) -> bool:
@@ -34,105 +121,286 @@ class LedController:
         except ValueError:
             return ip1 == ip2
 
+    @property
+    def ready(self) -> bool:
+        """Return True when the transport and the send channel are open."""
+        return (
+            self._transport is not None
+            and self._transport.started
+            and (not self._connect or (self._channel is not None and self._channel.open))
+        )
+
     async def async_initialize(self):
-        """Initialization of socket (during start process)."""
-        try:
-            if hasattr(self, '_udp_socket') and self._udp_socket:
+        """Initialization of the transport (during start process).
+
+        Guarded by a lock, so concurrent callers open each socket once.
+        """
+        async with self._init_lock:
+            try:
+                if self._transport is None:
+                    self._transport = H806SBTransport()
+                if not self._transport.started:
+                    self.metrics.socket_inits += 1
+                    await self._transport.async_start()
+            except Exception as e:
+                _LOGGER.error(f"Socket initialization failed: {e}")
+                raise
+            if self._connect and (self._channel is None or not self._channel.open):
+                channel = H806SBDeviceChannel((self._host, self._port), self._transport)
                 try:
-                    self._udp_socket.close()
-                except:
+                    await channel.async_open()
+                except OSError as err:
+                    # Sends fall back to the shared socket
+                    _LOGGER.debug("No connected socket to %s: %s", self._host, err)
+                    return
+                self.metrics.socket_inits += 1
+                self._channel = channel
+
+    def _write(self, data: bytes) -> None:
+        """Send one datagram, through the connected socket when it is open."""
+        if self._channel is not None and self._channel.open:
+            self._channel.send(data)
+        else:
+            self._transport.sendto(data, (self._host, self._port))
+
+    @property
+    def host(self) -> str:
+        """Return the address commands are sent to."""
+        return self._host
+
+    def set_host(self, host: str) -> None:
+        """Send to a new address; queued commands follow it."""
+        _LOGGER.info("Controller address changed from %s to %s", self._host, host)
+        self._host = host
+        # The next send reconnects through async_initialize
+        if self._channel is not None:
+            self._channel.close()
+            self._channel = None
+
+    def matches(self, ip: str, serial: bytes) -> bool:
+        """Return True if a reply from ``ip`` carrying ``serial`` is from this device."""
+        if (expected := self._expected_serial) is not None:
+            return int.from_bytes(serial, "big") == expected
+        return self.compare_ips(ip, self._host)
+
+    def matches_reply(self, replies: dict) -> bool:
+        """Return True if ``replies`` (keyed by serial and IP) holds this device."""
+        if (serial := self._expected_serial) is not None:
+            return serial in replies
+        return any(
+            isinstance(key, str) and self.compare_ips(key, self._host) for key in replies
+        )
+
+    async def async_send_packet(
+        self, brightness: int, speed: int, is_on: bool, reliable: bool = False
+    ):
+        """Queue control packet for the device.
+
+        Updates arriving faster than the minimum send interval are merged:
+        only the newest state is sent and every caller gets its result.
+        Turn-off (brightness 0 or not on) skips the wait for the next slot.
+
+        With ``reliable`` the packet is confirmed by a status probe and
+        retransmitted with the same sequence number up to ``max_retries``
+        times; otherwise it is fire-and-forget.
+        """
+        if not self.ready:
+            await self.async_initialize()
+        state = self._clamp_state(brightness, speed, is_on)
+        future = asyncio.get_running_loop().create_future()
+        self._pending_state = state
+        self._pending_reliable |= reliable
+        self._pending_waiters.append(future)
+        self.metrics.queue_depth = depth = len(self._pending_waiters)
+        if depth > self.metrics.max_queue_depth:
+            self.metrics.max_queue_depth = depth
+        if state[1] == 0 or not state[2]:
+            self._priority.set()
+        if self._sender is None or self._sender.done():
+            self._sender = asyncio.create_task(self._async_drain_queue())
+        return await future
+
+    async def _async_drain_queue(self):
+        """Send queued states, never faster than the minimum interval."""
+        loop = asyncio.get_running_loop()
+        while self._pending_state is not None:
+            delay = self._last_send_time + self.send_interval - loop.time()
+            if delay > 0 and not self._priority.is_set():
+                try:
+                    await asyncio.wait_for(self._priority.wait(), delay)
+                except asyncio.TimeoutError:
                     pass
-            loop = asyncio.get_event_loop()        
-            self._udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            if self._pending_state is None:
+                break  # superseded by a burst while waiting for the slot
+            state, waiters = self._pending_state, self._pending_waiters
+            reliable = self._pending_reliable
+            self._pending_state, self._pending_waiters = None, []
+            self._pending_reliable = False
+            self.metrics.queue_depth = 0
+            self._priority.clear()
+
+            if state == self._last_sent_state and (self._last_sent_confirmed or not reliable):
+                _LOGGER.debug("Skipping duplicate state for %s", self._host)
+                result = True
+            elif reliable:
+                result = await self._async_send_reliable(state)
+                if result is None and self._pending_state is not None:
+                    # Superseded by a newer command: its callers get that result,
+                    # sent the way the newer command asked for
+                    self._pending_waiters.extend(waiters)
+                    self.metrics.queue_depth = len(self._pending_waiters)
+                    continue
+                if result is None:
+                    result = True  # superseded by a burst, which sent a newer state
+            else:
+                result = self._send_state(state)
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(result)
+
+    @staticmethod
+    def _clamp_state(brightness: int, speed: int, is_on: bool) -> tuple[int, int, bool]:
+        return (
+            max(1, min(100, speed)),  # speed 1-100
+            max(0, min(31, brightness)),  # brightness 0-31
+            bool(is_on),
+        )
+
+    @property
+    def send_interval(self) -> float:
+        """Minimum interval stretched by up to 5x as the measured loss grows."""
+        return self._min_interval * (1 + 4 * self.loss_rate)
 
-            #settings of socket
-            self._udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)  
-            #self._udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-            self._udp_socket.setblocking(False)
+    def _record_delivery(self, lost: bool) -> None:
+        self.loss_rate += LOSS_SMOOTHING * ((1.0 if lost else 0.0) - self.loss_rate)
+
+    def _build_packet(self, state: tuple[int, int, bool]) -> bytearray:
+        """Build the control packet for a state with the next counter value."""
+        return self._template.encode((self._command_counter + 1) % 256, *self._wire_fields(state))
+
+    @staticmethod
+    def _wire_fields(state: tuple[int, int, bool]) -> tuple[int, int, int]:
+        """Speed, brightness and mode bytes of a state."""
+        speed, brightness, is_on = state
+        return speed, brightness, MODE_SINGLE_FILE if is_on else MODE_OFF
+
+    def _mark_sent(self, state: tuple[int, int, bool]) -> None:
+        self.metrics.packets_sent += 1
+        self._command_counter += 1
+        self._last_send_time = asyncio.get_running_loop().time()
+        self._last_sent_state = state
+        self._last_sent_confirmed = False
+
+    def _send_state(self, state: tuple[int, int, bool]) -> bool:
+        """Build and send one control packet."""
+        packet = self._build_packet(state)
+        try:
+            self._write(packet)
+            self._mark_sent(state)
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug("Sent to %s:%s - %s", self._host, self._port, packet.hex())
+            return True
+        except Exception as err:
+            _LOGGER.error("Error sending UDP packet: %s", err)
+            self.metrics.send_errors += 1
+            return False
+
+    async def _async_send_reliable(self, state: tuple[int, int, bool]) -> bool | None:
+        """Send a state and confirm it, retransmitting the same sequence number.
+
+        Returns None when a newer command (queued or sent by a burst) made
+        the state stale before it was confirmed; it is not retransmitted.
+        """
+        sequence = (self._command_counter + 1) % 256
+        for attempt in range(1 + self._max_retries):
+            if attempt:
+                if self._pending_state is not None or self._command_counter % 256 != sequence:
+                    _LOGGER.debug("Command #%d to %s superseded, not retransmitted", sequence, self._host)
+                    return None
+                self.metrics.retransmits += 1
+                _LOGGER.debug("Retransmitting #%d to %s (attempt %d)", sequence, self._host, attempt + 1)
+            # Re-encode: the template may have been used by a burst meanwhile
+            packet = self._template.encode(sequence, *self._wire_fields(state))
             try:
-                self._udp_socket.bind(('0.0.0.0', 4882))
-                _LOGGER.debug("Socket bound to port 4882")
+                self._write(packet)
+            except Exception as err:
+                _LOGGER.error("Error sending UDP packet: %s", err)
+                self.metrics.send_errors += 1
+                return False
+            if attempt == 0:
+                self._mark_sent(state)
+            if await self.async_check_availability(self._ack_timeout):
+                self._last_sent_confirmed = True
+                return True
+        self.metrics.unconfirmed += 1
+        _LOGGER.warning("Command #%d to %s was not confirmed", sequence, self._host)
+        return False
 
-            except OSError as e:
-                # Если не получилось - используем случайный порт
-                _LOGGER.warning(f"Could not bind to port 4882: {e}, using random port")
-                try:
-                    self._udp_socket.bind(('0.0.0.0', 0))
-                    _LOGGER.debug(f"Socket bound to random port: {self._udp_socket.getsockname()[1]}")
-                except OSError as e:
-                    _LOGGER.error(f"Failed to bind socket: {e}")
-                    self._udp_socket.close()
-                    self._udp_socket = None
-                    raise
-        except Exception as e:
-            _LOGGER.error(f"Socket initialization failed: {e}")
-            raise
+    async def async_confirm_last_sent(self) -> bool:
+        """Confirm the last state sent, e.g. by a burst, with a status probe.
 
-    async def async_send_packet(self, brightness: int, speed: int, is_on: bool):
-        """Send control packet to device."""
-        if not self._udp_socket:
-            await self.async_initialize() 
-        packet = bytearray(self._base_packet)
-        packet[2] = (self._command_counter + 1) % 256
-        packet[3] = max(1, min(100, speed))  # speed 1-100
-        packet[4] = max(0, min(31, brightness))  # brightness 0-31
-        packet[5] = 1 if is_on else 0
-        packet[12:15] = self._serial_number
-        
+        On a missed probe the state is resent reliably. Returns True once the
+        state is confirmed or a newer one has replaced it.
+        """
+        if (state := self._last_sent_state) is None:
+            return False
+        if self._last_sent_confirmed:
+            return True
+        if await self.async_check_availability(self._ack_timeout):
+            if self._last_sent_state == state:
+                self._last_sent_confirmed = True
+            return True
+        if self._last_sent_state != state:
+            return True  # superseded while probing
+        speed, brightness, is_on = state
+        return await self.async_send_packet(brightness, speed, is_on, reliable=True)
+
+    def send_datagram(self, data: bytes) -> bool:
+        """Send a prebuilt datagram (e.g. pixel data) without queueing."""
         try:
-            await asyncio.get_event_loop().sock_sendto(
-                self._udp_socket,
-                packet,
-                (self._host, self._port)
-            )
-            self._command_counter += 1
-            _LOGGER.debug("Sent to %s:%s - %s", self._host, self._port, packet.hex())
+            self._write(data)
             return True
         except Exception as err:
             _LOGGER.error("Error sending UDP packet: %s", err)
+            self.metrics.send_errors += 1
             return False
 
+    def _supersede_pending(self, result: bool) -> None:
+        """Resolve queued callers with the result of a newer command."""
+        waiters = self._pending_waiters
+        self._pending_state, self._pending_waiters = None, []
+        self._pending_reliable = False
+        self.metrics.queue_depth = 0
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(result)
+
     async def async_check_availability(self, timeout: float = 2.0) -> bool:
         """Check availability of led controller"""
         try:
-            # Reinitialize socket if needed
-            if not hasattr(self, '_udp_socket') or self._udp_socket is None or getattr(self._udp_socket, '_closed', True):
-                await self.async_initialize()  # Создаем новый сокет
+            # Reinitialize transport if needed
+            if not self.ready:
+                await self.async_initialize()
             
-            # Формат пакета из дампа
-            check_packet = bytearray([
-                0xAB, 0x01, 0x00, 0x02,  # Header
-                0x00, 0x00, 0x00, 0x00,  # Reserved bytes
-                0x00, 0x00, 0x00, 0x00   # Serial number
-            ])
-
-            _LOGGER.debug(f"Sending alive check: {check_packet.hex()} to {self._host}:4626")
+            _LOGGER.debug("Sending alive check to %s:%s", self._host, self._port)
 
-            # Отправка на порт 4626
-            loop = asyncio.get_event_loop()
-            await loop.sock_sendto(self._udp_socket, check_packet, (self._host, 4626))
-
-            # Ожидание ответа
-            try:
-                data, addr = await asyncio.wait_for(
-                    loop.sock_recvfrom(self._udp_socket, 128),
-                    timeout=timeout
-                )
-                _LOGGER.debug(f"Received from {addr[0]}:{addr[1]}: {data.hex()}")
-                
-                # Проверка только первых 2 байт
-                if len(data) >= 2 and data[0] == 0xAB and data[1] == 0x02:
-                    return True
-                    
-            except (asyncio.TimeoutError, socket.timeout):
+            # The shared transport routes the reply back by source IP and serial
+            self.metrics.probes_sent += 1
+            start = time.perf_counter()
+            reply = await self._transport.async_request(
+                PROBE_PACKET,
+                (self._host, self._port),
+                serial=self._expected_serial,
+                timeout=timeout,
+            )
+            self._record_delivery(lost=reply is None)
+            if reply is None:
+                self.metrics.probe_timeouts += 1
                 _LOGGER.debug("No response received within timeout")
-            except OSError as e:
-                _LOGGER.warning(f"Socket error: {e}")
-                # Закрываем сокет при ошибке
-                self._udp_socket.close()
-                self._udp_socket = None
-
-            return False
+                return False
+            self.last_rtt_ms = (time.perf_counter() - start) * 1000
+            self.metrics.availability_rtt_ms.observe(self.last_rtt_ms)
+            return True
 
         except Exception as e:
             _LOGGER.error(f"Availability check failed: {e}", exc_info=True)
@@ -140,20 +408,17 @@ class LedController:
 
     async def async_close(self):
         """Cleaning of resources."""
-        if self._udp_socket:
-            self._udp_socket.close()
-
-    def calculate_checksum(data):
-        """Calculate UDP checksum manually"""
-        if len(data) % 2 != 0:
-            data += b'\x00'
-        checksum = 0
-        for i in range(0, len(data), 2):
-            word = (data[i] << 8) + data[i+1]
-            checksum += word
-        checksum = (checksum >> 16) + (checksum & 0xffff)
-        checksum = ~checksum & 0xffff
-        return checksum
+        if self._sender:
+            self._sender.cancel()
+            self._sender = None
+        self._supersede_pending(False)
+        if self._channel is not None:
+            self._channel.close()
+            self._channel = None
+        # A shared transport is owned by the integration, not by the controller
+        if self._owns_transport and self._transport:
+            self._transport.close()
+            self._transport = None
 
     def set_serial_number(self, serial_number: str):
         """Setting the serial number with zero filling and reverse..
@@ -162,26 +427,12 @@ class LedController:
             "0с3951" (3 bytes) -> filling to 4 bytes - "00 0с 39 51" -> revers to "51 39 0с 00"
         """
         try:
-            # Converting hex-string to bytes
-            serial_as_bytes = bytes.fromhex(serial_number)
-            _LOGGER.debug(f"Original serial: {serial_as_bytes.hex(' ')}")
-            
-            # Filling by zero on left 
-            if len(serial_as_bytes) < 4:
-                padding = bytes(4 - len(serial_as_bytes))
-                serial_as_bytes = padding + serial_as_bytes
-                _LOGGER.debug(f"Padded serial: {serial_as_bytes.hex(' ')}")
-
-            # Revesr of bytes (little-endian)
-            reversed_serial = bytearray(reversed(serial_as_bytes))
-            _LOGGER.debug(f"Final serial: {bytes(reversed_serial).hex(' ')}")
-            self._serial_number[:] = reversed_serial
-            
-            _LOGGER.info(f"Serial number set: {self._serial_number.hex()}")
-            
+            # Converting hex-string to the little-endian wire format
+            serial = serial_to_wire(bytes.fromhex(serial_number))
         except ValueError as ve:
             _LOGGER.error(f"Invalid serial number format: {ve}")
             raise
-        except Exception as e:
-            _LOGGER.error(f"Error setting serial: {e}")
-            raise
\ No newline at end of file
+        self._serial_number[:] = serial
+        self._template.set_serial(serial)
+        self._expected_serial = int.from_bytes(serial, "little") or None
+        _LOGGER.info(f"Serial number set: {self._serial_number.hex()}")
@@ -0,0 +1,250 @@
+"""Coordinators and runtime data of the H806SB Led Controller integration."""
+
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass
+import logging
+import random
+import time
+from typing import TYPE_CHECKING
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from .const import (
+    DEFAULT_MISS_THRESHOLD,
+    FAST_PROBE_INTERVAL,
+    MAX_POLL_INTERVAL,
+    PROBE_JITTER,
+    RESOLVE_AFTER_MISSES,
+    RESOLVE_WINDOW,
+    SWEEP_WINDOW,
+    TRACK_INTERVAL,
+)
+from .cache import H806SBDeviceCache
+from .controller import LedController
+from .discovery import DiscoveredDevice, H806SBDiscovery
+from .transport import H806SBTransport
+
+if TYPE_CHECKING:
+    from .light import H806SBLight
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class H806SBRuntimeData:
+    """Everything one config entry needs, built once in async_setup_entry."""
+
+    controller: LedController
+    coordinator: H806SBCoordinator
+    serial: bytes | None
+    light: H806SBLight | None = None
+    startup_seconds: float = 0.0
+    first_probe_seconds: float | None = None
+
+
+H806SBConfigEntry = ConfigEntry[H806SBRuntimeData]
+
+
+def unique_id_prefix(config: Mapping) -> str:
+    """Prefix of the entity unique IDs of one entry.
+
+    Devices are tracked by serial, so the IDs survive address changes;
+    only entries without a serial fall back to the host.
+    """
+    if serial := config.get("serial_number"):
+        return f"h806sb_{bytes.fromhex(serial).hex()}"
+    return f"h806sb_{config['host']}"
+
+
+class H806SBSweepCoordinator(DataUpdateCoordinator):
+    """Availability of all controllers from one broadcast probe.
+
+    Each entry coordinator listens to the sweep, so one refresh updates
+    every entry in a single pass. The sweep only polls while entries are
+    listening.
+    """
+
+    def __init__(
+        self,
+        hass,
+        transport: H806SBTransport,
+        discovery_factory: Callable[[], Awaitable[H806SBDiscovery]] | None = None,
+    ):
+        """Initialize."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name="H806SB Availability Sweep",
+            update_interval=TRACK_INTERVAL
+        )
+        self._transport = transport
+        self._discovery_factory = discovery_factory
+        # Duration of the last sweep divided by the entries it served
+        self.cost_per_entry = 0.0
+
+    async def async_create_discovery(self) -> H806SBDiscovery:
+        """Return a discovery that probes every configured network."""
+        if self._discovery_factory is not None:
+            return await self._discovery_factory()
+        return H806SBDiscovery(self._transport)
+
+    async def _async_update_data(self) -> dict[int | str, DiscoveredDevice]:
+        """Collect every reply to one broadcast, keyed by serial and IP."""
+        discovery = await self.async_create_discovery()
+        replies = {}
+        start = time.monotonic()
+        try:
+            async for device in discovery.async_discover(SWEEP_WINDOW):
+                replies[int.from_bytes(device.serial, "big")] = device
+                replies[device.ip] = device
+        except Exception as err:
+            raise UpdateFailed(f"Availability sweep failed: {err}") from err
+        self.cost_per_entry = (time.monotonic() - start) / max(1, len(self._listeners))
+        _LOGGER.debug("Availability sweep: %d device(s) replied", len(replies) // 2)
+        return replies
+
+
+class H806SBCoordinator(DataUpdateCoordinator):
+    """Coordiantor for periodically check.
+
+    Any valid reply from the device counts as liveness and pushes the next
+    own probe further away, doubling the interval up to MAX_POLL_INTERVAL
+    while the device stays healthy. After a miss the device is re-probed
+    quickly with jitter, and it is only reported unavailable after
+    ``miss_threshold`` misses in a row.
+
+    A device with a known serial is followed to a new address: a reply
+    carrying its serial from another IP, or found by the re-resolve
+    broadcast sent after RESOLVE_AFTER_MISSES misses, moves the controller
+    there and calls ``on_address_change``.
+    """
+
+    def __init__(
+        self,
+        hass,
+        controller,
+        sweep: H806SBSweepCoordinator,
+        miss_threshold: int = DEFAULT_MISS_THRESHOLD,
+        cache: H806SBDeviceCache | None = None,
+        serial: bytes | None = None,
+        on_address_change: Callable[[str], None] | None = None,
+    ):
+        """Initialize."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name="H806SB Device Status",
+            update_interval=TRACK_INTERVAL,
+            # Own probes notify only when the availability changes
+            always_update=False,
+        )
+        self.controller = controller
+        self._sweep = sweep
+        self._miss_threshold = max(1, miss_threshold)
+        self._misses = 0
+        self._cache = cache
+        self._serial = serial
+        self._on_address_change = on_address_change
+        self.address_changes = 0
+        # Poll cost of this entry: own probes plus its share of the sweeps
+        self.poll_count = 0
+        self.poll_seconds = 0.0
+
+    @property
+    def available(self) -> bool:
+        """Return False once the miss threshold is reached."""
+        return self._misses < self._miss_threshold
+
+    def _note_alive(self) -> None:
+        if self._misses:
+            self._misses = 0
+            self.update_interval = TRACK_INTERVAL
+        else:
+            self.update_interval = min(self.update_interval * 2, MAX_POLL_INTERVAL)
+
+    def _note_miss(self) -> None:
+        self._misses += 1
+        jitter = random.uniform(1 - PROBE_JITTER, 1 + PROBE_JITTER)
+        self.update_interval = FAST_PROBE_INTERVAL * jitter
+        _LOGGER.debug(
+            "%s missed %d of %d probe(s)",
+            self.controller._host, self._misses, self._miss_threshold,
+        )
+
+    @callback
+    def _async_publish(self) -> None:
+        """Publish the availability and re-arm the probe timer.
+
+        The entities only write their state when it changed, so passing
+        unchanged data on is cheap.
+        """
+        self.async_set_updated_data({"available": self.available})
+
+    @callback
+    def async_seed(self, available: bool | None) -> None:
+        """Publish an assumed availability (None: unknown) until the first probe."""
+        self.async_set_updated_data({"available": available})
+
+    @callback
+    def async_handle_reply(self, ip: str, name: str, serial: bytes) -> None:
+        """Count any reply of this device seen by the shared transport."""
+        if self.controller.matches(ip, serial):
+            if not self.controller.compare_ips(ip, self.controller.host):
+                self._async_move(ip)
+            self._note_alive()
+            self._async_publish()
+
+    @callback
+    def _async_move(self, ip: str) -> None:
+        """Follow the device to a new address."""
+        self.controller.set_host(ip)
+        self.address_changes += 1
+        if self._on_address_change:
+            self._on_address_change(ip)
+
+    async def _async_resolve(self) -> None:
+        """Broadcast for the serial; the reply moves the controller through async_handle_reply."""
+        discovery = await self._sweep.async_create_discovery()
+        if await discovery.async_resolve(self._serial, RESOLVE_WINDOW) is None:
+            _LOGGER.debug("%s did not answer at any address", self.controller.host)
+
+    @callback
+    def async_handle_sweep(self) -> None:
+        """Probe the device directly when it did not answer the broadcast sweep.
+
+        Routed or manually added devices, and those on a subnet outside the
+        current sweep window, never answer the broadcast; only the unicast
+        probe counts a miss.
+        """
+        sweep = self._sweep
+        if not sweep.last_update_success or sweep.data is None:
+            return
+        self.poll_count += 1
+        self.poll_seconds += sweep.cost_per_entry
+        # Replies were already counted by async_handle_reply
+        if not self.controller.matches_reply(sweep.data):
+            self.hass.async_create_task(self.async_request_refresh())
+
+    async def _async_update_data(self):
+        """Checking the available devices."""
+        start = time.monotonic()
+        try:
+            # A reply was already counted by async_handle_reply
+            if not await self.controller.async_check_availability():
+                self._note_miss()
+                if self._serial is not None and not self._misses % RESOLVE_AFTER_MISSES:
+                    await self._async_resolve()
+            elif self._cache is not None and self._serial is not None:
+                self._cache.async_note_rtt(self._serial, self.controller.last_rtt_ms)
+            _LOGGER.debug(f"available:{self.available}")
+            return {"available": self.available}
+        except Exception as err:
+            _LOGGER.error("Error checking device availability: %s", err)
+            raise UpdateFailed(f"Error checking device: {err}")
+        finally:
+            self.poll_count += 1
+            self.poll_seconds += time.monotonic() - start
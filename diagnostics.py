@@ -0,0 +1,40 @@
+"""Diagnostics support for the H806SB Led Controller integration."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from .const import DATA_AUDIO, DATA_CACHE, DATA_TRANSPORT
+from .coordinator import H806SBConfigEntry
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: H806SBConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics of one config entry."""
+    data = entry.runtime_data
+    coordinator = data.coordinator
+    cache = hass.data.get(DATA_CACHE)
+    transport = hass.data.get(DATA_TRANSPORT)
+    capture = transport.capture if transport else None
+    audio = hass.data.get(DATA_AUDIO)
+    return {
+        "entry": dict(entry.data),
+        "available": coordinator.available,
+        "update_interval": coordinator.update_interval.total_seconds(),
+        "startup_seconds": data.startup_seconds,
+        "first_probe_seconds": data.first_probe_seconds,
+        "poll_count": coordinator.poll_count,
+        "poll_seconds": coordinator.poll_seconds,
+        "loss_rate": data.controller.loss_rate,
+        "send_interval": data.controller.send_interval,
+        "metrics": data.controller.metrics.as_dict(),
+        "state_writes": data.light.state_writes if data.light else None,
+        "suppressed_writes": data.light.suppressed_writes if data.light else None,
+        "cache": cache.get(data.serial) if cache and data.serial else None,
+        # Export the packets themselves with the export_capture service
+        "capture": {"recorded": capture.count, "stored": len(capture)} if capture else None,
+        "audio": audio.metrics.as_dict() if audio and audio.controls(data.controller) else None,
+    }
@@ -1,72 +1,189 @@
 import asyncio
-import socket
-from typing import Optional, Tuple
+from contextlib import aclosing
+from collections.abc import AsyncIterator, Iterable
+from ipaddress import IPv4Network, ip_network
+from typing import NamedTuple, Optional, Tuple
 import logging
-import time
+
+from .codec import DISCOVERY_PACKET, PROBE_PACKET, RESPONSE_HEADER
+from .transport import DEVICE_PORT, LISTEN_PORT, H806SBTransport
 
 _LOGGER = logging.getLogger(__name__)
 
+# Unicast probes per second when sweeping extra subnets
+DEFAULT_UNICAST_RATE = 500
+DEFAULT_DISCOVERY_TIMEOUT = 2.0
+
+class DiscoveredDevice(NamedTuple):
+    """Device that answered a discovery broadcast."""
+
+    ip: str
+    serial: bytes
+    name: str
+
+def parse_subnet(value: str) -> IPv4Network:
+    """Parse an IPv4 subnet like ``192.168.20.0/24`` (host bits are ignored)."""
+    network = ip_network(value, strict=False)
+    if not isinstance(network, IPv4Network):
+        raise ValueError(f"{value} is not an IPv4 subnet")
+    return network
+
+class SubnetSweep:
+    """Hosts of the extra subnets, probed in turns that resume.
+
+    A sweep cut by the discovery deadline goes on with the next host on
+    the next scan, so subnets larger than one scan window are covered
+    over successive scans. Keep one instance and pass it to every
+    discovery.
+    """
+
+    def __init__(self, subnets: Iterable[str] = ()) -> None:
+        self.subnets = [parse_subnet(subnet) for subnet in subnets]
+        # /31 and /32 have no network and broadcast address to skip
+        self._first = [1 if subnet.prefixlen < 31 else 0 for subnet in self.subnets]
+        self._counts = [
+            subnet.num_addresses - 2 * first for subnet, first in zip(self.subnets, self._first)
+        ]
+        self.size = sum(self._counts)
+        self._cursor = 0
+
+    def next_host(self) -> str:
+        """Return the next host to probe, wrapping around after the last one."""
+        index = self._cursor
+        self._cursor = (self._cursor + 1) % self.size
+        for subnet, first, count in zip(self.subnets, self._first, self._counts):
+            if index < count:
+                return str(subnet.network_address + first + index)
+            index -= count
+        raise IndexError("No hosts to sweep")
+
+    def scans_to_cover(self, rate: float, timeout: float) -> int:
+        """Return the number of scans needed to probe every host once."""
+        return -(-self.size // max(1, int(rate * timeout)))
+
+
 class H806SBDiscovery:
-    DEVICE_PORT = 4626
-    LISTEN_PORT = 4882 
-    DISCOVERY_PACKET = bytes([0xAB, 0x01])
-    RESPONSE_HEADER = bytes([0xAB, 0x02])
-
-    def __init__(self):
-        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1) 
-        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-        self._sock.bind(("0.0.0.0", self.LISTEN_PORT))
-        self._sock.setblocking(False) 
-        self._local_port = self._sock.getsockname()[1]
-        _LOGGER.debug(f"Discovery socket created on port: {self._local_port}")
+    """Finds controllers by broadcast and, optionally, unicast sweeps.
 
-    async def discover_device(self, timeout: int = 2) -> Optional[Tuple[str, bytes, str]]:
-        """Finding a compatible device on the network."""
+    One probe goes to every broadcast address at once (the limited
+    broadcast plus the directed broadcast of each local network), and
+    ``subnets`` that no broadcast reaches are swept with unicast probes
+    at ``unicast_rate`` packets per second, resuming where the last
+    sweep of the same :class:`SubnetSweep` stopped. All replies share
+    one deadline and are merged by serial.
+    """
+
+    DEVICE_PORT = DEVICE_PORT
+    LISTEN_PORT = LISTEN_PORT
+    DISCOVERY_PACKET = DISCOVERY_PACKET
+    RESPONSE_HEADER = RESPONSE_HEADER
+    BROADCAST_ADDRESS = "255.255.255.255"
+
+    def __init__(
+        self,
+        transport: H806SBTransport | None = None,
+        broadcast_address: str = BROADCAST_ADDRESS,
+        broadcast_addresses: Iterable[str] = (),
+        subnets: Iterable[str] | SubnetSweep = (),
+        unicast_rate: float = DEFAULT_UNICAST_RATE,
+    ):
+        # Without a shared transport the discovery opens its own socket
+        self._transport = transport
+        self._owns_transport = transport is None
+        self._broadcast_addresses = list(dict.fromkeys([broadcast_address, *broadcast_addresses]))
+        self._sweep = subnets if isinstance(subnets, SubnetSweep) else SubnetSweep(subnets)
+        self._unicast_rate = unicast_rate
+
+    async def async_discover(
+        self, timeout: float = DEFAULT_DISCOVERY_TIMEOUT
+    ) -> AsyncIterator[DiscoveredDevice]:
+        """Broadcast one probe and yield every device as soon as it replies.
+
+        Replies are de-duplicated by serial number. The generator ends when
+        ``timeout`` seconds have passed since the probe was sent.
+        """
+        if self._transport is None:
+            self._transport = H806SBTransport(self.LISTEN_PORT)
+        await self._transport.async_start()
+
+        loop = asyncio.get_running_loop()
+        replies: asyncio.Queue[DiscoveredDevice] = asyncio.Queue()
+        remove_listener = self._transport.add_listener(
+            lambda ip, name, serial: replies.put_nowait(DiscoveredDevice(ip, serial, name))
+        )
+        seen: set[bytes] = set()
+        deadline = loop.time() + timeout
+        sweep = None
         try:
-            loop = asyncio.get_running_loop()
-            
-            # Отправка широковещательного запроса
-            await loop.sock_sendto(
-                self._sock, 
-                self.DISCOVERY_PACKET, 
-                ("255.255.255.255", self.DEVICE_PORT)
-            )
-            _LOGGER.debug(f"Discovery packet sent from port {self._local_port}")
-
-            # Ожидание ответа с таймаутом
-            start_time = time.monotonic()
-            while (time.monotonic() - start_time) < timeout:
+            for address in self._broadcast_addresses:
                 try:
-                    # Асинхронное получение данных
-                    data, addr = await loop.sock_recvfrom(self._sock, 128)
-                    _LOGGER.debug(f"Received response from {addr}: {data.hex()}")
-                    
-                    if data.startswith(self.RESPONSE_HEADER):
-                        # Извлечение имени устройства
-                        name_data = data[2:]
-                        name = name_data.split(b'\x00')[0].decode("ascii", errors="ignore")
-                        
-                        # Парсинг серийного номера
-                        if "_" in name:
-                            _, hex_part = name.split("_", 1)
-                            try:
-                                serial_number = bytes.fromhex(hex_part)
-                                return (addr[0], serial_number, name)
-                            except ValueError:
-                                _LOGGER.warning(f"Invalid serial format: {hex_part}")
-                except BlockingIOError:
-                    await asyncio.sleep(0.1)
-                except OSError as e:
-                    _LOGGER.error(f"Socket error: {e}")
+                    self._transport.sendto(self.DISCOVERY_PACKET, (address, self.DEVICE_PORT))
+                except OSError as err:  # e.g. a network that went down
+                    _LOGGER.debug("Broadcast to %s failed: %s", address, err)
+            _LOGGER.debug("Discovery packet sent to %s", ", ".join(self._broadcast_addresses))
+            if self._sweep.size:
+                sweep = loop.create_task(self._async_sweep(deadline))
+
+            while (remaining := deadline - loop.time()) > 0:
+                try:
+                    device = await asyncio.wait_for(replies.get(), remaining)
+                except asyncio.TimeoutError:
                     break
-                    
+                if device.serial in seen:
+                    continue
+                seen.add(device.serial)
+                _LOGGER.debug("Discovered %s (IP: %s)", device.name, device.ip)
+                yield device
+        finally:
+            remove_listener()
+            if sweep is not None:
+                sweep.cancel()
+        _LOGGER.debug("Discovery finished, %d device(s) found", len(seen))
+
+    async def _async_sweep(self, deadline: float) -> None:
+        """Probe the hosts of the extra subnets, rate-limited, until the deadline."""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        sent = 0
+        for _ in range(self._sweep.size):
+            if loop.time() >= deadline:
+                _LOGGER.debug("Unicast sweep cut at the deadline after %d probes", sent)
+                return
+            host = self._sweep.next_host()
+            try:
+                self._transport.sendto(PROBE_PACKET, (host, self.DEVICE_PORT))
+            except OSError as err:
+                _LOGGER.debug("Unicast probe to %s failed: %s", host, err)
+            sent += 1
+            # Keep to the rate, sleeping in steps of at least 10 ms
+            if (ahead := start + sent / self._unicast_rate - loop.time()) > 0.01:
+                await asyncio.sleep(ahead)
+        _LOGGER.debug("Unicast sweep sent %d probes", sent)
+
+    async def async_resolve(self, serial: bytes, timeout: float = 1.0) -> DiscoveredDevice | None:
+        """Broadcast one probe and return the device carrying ``serial``.
+
+        Returns as soon as that device replies, None after ``timeout``.
+        """
+        wanted = int.from_bytes(serial, "big")
+        async with aclosing(self.async_discover(timeout)) as devices:
+            async for device in devices:
+                if int.from_bytes(device.serial, "big") == wanted:
+                    return device
+        return None
+
+    async def discover_device(self, timeout: int = 2) -> Optional[Tuple[str, bytes, str]]:
+        """Finding a compatible device on the network."""
+        try:
+            async with aclosing(self.async_discover(timeout)) as devices:
+                async for device in devices:
+                    return tuple(device)
         except Exception as e:
             _LOGGER.error(f"Discovery failed: {e}", exc_info=True)
         return None
 
     def close(self):
-        if self._sock:
+        if self._owns_transport and self._transport:
             _LOGGER.debug("Closing socket for discovery")
-            self._sock.close()
-            self._sock = None
\ No newline at end of file
+            self._transport.close()
+            self._transport = None
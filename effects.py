@@ -0,0 +1,276 @@
+"""Animated effects for H806SB controllers.
+
+The SD card programs only know one speed byte, so effects like strobe or
+breathe are rendered here. Every running effect of every controller is
+scheduled on one hierarchical :class:`TimerWheel` served by a single task;
+the steps due in the same tick are sent in one burst.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Hashable
+from dataclasses import dataclass, field
+import logging
+import math
+
+from .controller import LedController, async_send_burst
+
+_LOGGER = logging.getLogger(__name__)
+
+EFFECT_STROBE = "strobe"
+EFFECT_BREATHE = "breathe"
+EFFECT_CHASE = "chase"
+
+# Effects a single light can show, chase needs several devices
+LIGHT_EFFECTS = [EFFECT_STROBE, EFFECT_BREATHE]
+GROUP_EFFECTS = [EFFECT_STROBE, EFFECT_BREATHE, EFFECT_CHASE]
+
+# Default duration of one cycle (strobe, breathe) or one step (chase)
+EFFECT_PERIODS = {
+    EFFECT_STROBE: 0.2,
+    EFFECT_BREATHE: 4.0,
+    EFFECT_CHASE: 0.3,
+}
+MIN_STEP = 0.05  # the device accepts a command every 50 ms
+
+
+class TimerWheel:
+    """Hierarchical timing wheel with integer ticks.
+
+    Level ``n`` has ``2**bits`` slots of ``2**(bits * n)`` ticks each, so
+    scheduling and expiring a timer are O(1) however many are pending.
+    Timers of the higher levels cascade down when the lower level wraps.
+    The wheel keeps no clock of its own, the caller advances it.
+    """
+
+    def __init__(self, bits: int = 6, levels: int = 4) -> None:
+        self._bits = bits
+        self._levels = levels
+        self._mask = (1 << bits) - 1
+        self._wheels: list[list[list[tuple[int, Hashable]]]] = [
+            [[] for _ in range(1 << bits)] for _ in range(levels)
+        ]
+        self._horizon = (1 << (bits * levels)) - 1
+        self.tick = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def reset(self, tick: int) -> None:
+        """Move an empty wheel to ``tick`` without walking the ticks between."""
+        if self._count:
+            raise RuntimeError("Only an empty wheel can be reset")
+        self.tick = tick
+
+    def schedule(self, tick: int, item: Hashable) -> None:
+        """Expire ``item`` at ``tick``; past ticks expire on the next one."""
+        self._count += 1
+        self._place(max(tick, self.tick + 1), item)
+
+    def _place(self, tick: int, item: Hashable) -> None:
+        # Timers beyond the horizon are parked in the last level and placed
+        # again when it cascades
+        delta = min(tick - self.tick, self._horizon)
+        level = 0
+        while delta >> (self._bits * (level + 1)):
+            level += 1
+        slot_tick = self.tick + delta
+        self._wheels[level][(slot_tick >> (self._bits * level)) & self._mask].append((tick, item))
+
+    def advance(self, tick: int) -> list[Hashable]:
+        """Advance to ``tick`` and return the items that expired on the way."""
+        due = []
+        while self.tick < tick:
+            self.tick += 1
+            current = self.tick
+            # Cascade from the highest wrapping level down, so timers land in
+            # lower slots that have not been emptied yet
+            level = 1
+            while level < self._levels and not current & ((1 << (self._bits * level)) - 1):
+                level += 1
+            for cascade in range(level - 1, 0, -1):
+                slot = (current >> (self._bits * cascade)) & self._mask
+                entries = self._wheels[cascade][slot]
+                self._wheels[cascade][slot] = []
+                for entry in entries:
+                    self._place(*entry)
+            slot = current & self._mask
+            entries = self._wheels[0][slot]
+            self._wheels[0][slot] = []
+            for entry_tick, item in entries:
+                if entry_tick <= current:
+                    due.append(item)
+                    self._count -= 1
+                else:
+                    self._place(entry_tick, item)
+        return due
+
+    def next_tick(self) -> int | None:
+        """Return the next tick that needs an advance, None when empty.
+
+        This is the next occupied slot of the lowest level, or the next
+        cascade point if that level is empty.
+        """
+        if not self._count:
+            return None
+        lowest = self._wheels[0]
+        for offset in range(1, self._mask + 2):
+            tick = self.tick + offset
+            if lowest[tick & self._mask] or not tick & self._mask:
+                return tick
+        return self.tick + self._mask + 1
+
+
+@dataclass(eq=False, slots=True)
+class Effect:
+    """One effect running on one or more controllers."""
+
+    name: str
+    controllers: list[LedController]
+    level: int
+    speed: int
+    step_time: float
+    steps: int
+    start_tick: int
+    step: int = 0
+    last_sent: dict[LedController, int] = field(default_factory=dict)
+
+    def levels(self) -> list[tuple[LedController, int]]:
+        """Return the device brightness of every controller at this step."""
+        phase = (self.step % self.steps) / self.steps
+        count = len(self.controllers)
+        if self.name == EFFECT_STROBE:
+            value = self.level if phase < 0.5 else 0
+            return [(controller, value) for controller in self.controllers]
+        if self.name == EFFECT_BREATHE:
+            value = round(self.level * (1 - math.cos(2 * math.pi * phase)) / 2)
+            return [(controller, value) for controller in self.controllers]
+        # chase: one controller lit at a time, in order
+        lit = self.step % count
+        return [
+            (controller, self.level if index == lit else 0)
+            for index, controller in enumerate(self.controllers)
+        ]
+
+
+class EffectEngine:
+    """Runs the effects of many controllers on one timer wheel and task."""
+
+    def __init__(self, resolution: float = 0.01) -> None:
+        self.resolution = resolution
+        self._wheel = TimerWheel()
+        self._effects: dict[LedController, Effect] = {}
+        self._origin: float | None = None
+        self._task: asyncio.Task | None = None
+        self._wakeup = asyncio.Event()
+        self.steps_rendered = 0
+        self.bursts = 0
+
+    def running(self, controller: LedController) -> str | None:
+        """Return the name of the effect running on ``controller``."""
+        effect = self._effects.get(controller)
+        return effect.name if effect else None
+
+    def start(
+        self,
+        name: str,
+        controllers: list[LedController],
+        level: int,
+        speed: int,
+        period: float | None = None,
+    ) -> Effect:
+        """Start effect ``name`` on ``controllers`` at device brightness ``level``.
+
+        The controllers leave any effect they were running; the other
+        controllers of that effect keep it.
+        """
+        if name not in EFFECT_PERIODS:
+            raise ValueError(f"Unknown effect: {name}")
+        for controller in controllers:
+            self.stop(controller)
+
+        period = period or EFFECT_PERIODS[name]
+        if name == EFFECT_CHASE:
+            step_time, steps = max(period, MIN_STEP), len(controllers)
+        elif name == EFFECT_STROBE:
+            step_time, steps = max(period / 2, MIN_STEP), 2
+        else:
+            steps = max(2, round(period / MIN_STEP))
+            step_time = period / steps
+
+        loop = asyncio.get_running_loop()
+        if self._origin is None or not len(self._wheel):
+            self._origin = loop.time()
+            self._wheel.reset(0)
+        # The wheel only advances when the task wakes up, so its tick may be
+        # far behind; steps placed from it would all be overdue at once
+        start_tick = self._tick_at(loop.time())
+        effect = Effect(name, list(controllers), level, speed, step_time, steps, start_tick)
+        for controller in controllers:
+            self._effects[controller] = effect
+        self._wheel.schedule(start_tick, effect)
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._async_run())
+        else:
+            self._wakeup.set()
+        return effect
+
+    def stop(self, controller: LedController) -> bool:
+        """Remove ``controller`` from its effect; returns True if it had one."""
+        if (effect := self._effects.pop(controller, None)) is None:
+            return False
+        effect.controllers.remove(controller)
+        effect.last_sent.pop(controller, None)
+        return True
+
+    def _tick_at(self, now: float) -> int:
+        return int((now - self._origin) / self.resolution)
+
+    def _render(self, due: list[Effect]) -> list[tuple[LedController, int, int, bool]]:
+        commands = []
+        for effect in due:
+            if not effect.controllers:
+                continue  # every controller left, drop the timer
+            for controller, level in effect.levels():
+                if effect.last_sent.get(controller) != level:
+                    effect.last_sent[controller] = level
+                    commands.append((controller, level, effect.speed, True))
+            effect.step += 1
+            self.steps_rendered += 1
+            # Steps are placed relative to the start, so late ticks do not drift
+            ticks = round(effect.step * effect.step_time / self.resolution)
+            self._wheel.schedule(effect.start_tick + ticks, effect)
+        return commands
+
+    async def _async_run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._effects:
+            due = self._wheel.advance(self._tick_at(loop.time()))
+            if commands := self._render(due):
+                self.bursts += 1
+                try:
+                    await async_send_burst(commands)
+                except Exception:  # keep the other effects running
+                    _LOGGER.exception("Error sending effect burst")
+            if (tick := self._wheel.next_tick()) is None:
+                break
+            delay = self._origin + tick * self.resolution - loop.time()
+            self._wakeup.clear()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        # Drop the timers of finished effects, so the wheel can restart at 0
+        self._wheel = TimerWheel()
+        self._task = None
+
+    def close(self) -> None:
+        """Stop every effect."""
+        self._effects.clear()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._wheel = TimerWheel()
@@ -0,0 +1,168 @@
+"""Local UDP emulator of H806SB controllers.
+
+Every emulated device listens on its own loopback address, answers
+``AB 01`` probes with ``AB 02 <name>_<serial>`` and records the ``FB C1``
+commands it receives. Latency, loss and reordering can be configured to
+mimic a congested Wi-Fi network.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+import logging
+import random
+
+from .codec import DISCOVERY_PACKET, ControlCommand, decode_control, encode_reply
+from .transport import DEVICE_PORT
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class NetworkConditions:
+    """Impairments applied to every datagram an emulated device handles."""
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    # probability to drop a datagram, applied to requests and to replies
+    loss: float = 0.0
+    # probability that a reply is held back so that later ones overtake it
+    reorder: float = 0.0
+    reorder_delay: float = 0.05
+
+
+class EmulatedDevice(asyncio.DatagramProtocol):
+    """One emulated controller."""
+
+    def __init__(
+        self,
+        name: str,
+        serial: bytes,
+        conditions: NetworkConditions | None = None,
+        rng: random.Random | None = None,
+    ) -> None:
+        self.name = f"{name}_{serial.hex()}"
+        self.serial = serial
+        self.conditions = conditions or NetworkConditions()
+        self.commands: list[tuple[float, ControlCommand]] = []
+        self.probes = 0
+        self.dropped = 0
+        self._rng = rng or random.Random()
+        self._transport: asyncio.DatagramTransport | None = None
+        self._reply = encode_reply(self.name)
+
+    @property
+    def address(self) -> tuple[str, int]:
+        """Return the address the device listens on."""
+        return self._transport.get_extra_info("sockname")[:2]
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self._transport = transport
+
+    def datagram_received(self, data: bytes, addr: tuple) -> None:
+        if self._lost():
+            return
+        if data.startswith(DISCOVERY_PACKET):
+            self.probes += 1
+            self.reply(addr)
+        elif (command := decode_control(data)) is not None:
+            self.commands.append((asyncio.get_running_loop().time(), command))
+            _LOGGER.debug("%s received command %s", self.name, command)
+        else:
+            _LOGGER.debug("%s ignored %s from %s", self.name, data.hex(), addr[0])
+
+    def reply(self, addr: tuple) -> None:
+        """Answer a probe after the configured delay."""
+        if self._lost():
+            return
+        conditions = self.conditions
+        delay = conditions.latency + self._rng.uniform(0, conditions.jitter)
+        if conditions.reorder and self._rng.random() < conditions.reorder:
+            delay += conditions.reorder_delay
+        if delay <= 0:
+            self._send(addr)
+        else:
+            asyncio.get_running_loop().call_later(delay, self._send, addr)
+
+    def _lost(self) -> bool:
+        if self.conditions.loss and self._rng.random() < self.conditions.loss:
+            self.dropped += 1
+            return True
+        return False
+
+    def _send(self, addr: tuple) -> None:
+        if self._transport is not None and not self._transport.is_closing():
+            self._transport.sendto(self._reply, addr)
+
+
+class _BroadcastResponder(asyncio.DatagramProtocol):
+    """Stands in for the broadcast address: every device answers from its own IP."""
+
+    def __init__(self, devices: list[EmulatedDevice]) -> None:
+        self._devices = devices
+
+    def datagram_received(self, data: bytes, addr: tuple) -> None:
+        if data.startswith(DISCOVERY_PACKET):
+            for device in self._devices:
+                device.datagram_received(data, addr)
+
+
+class H806SBEmulator:
+    """A fleet of emulated controllers on 127.0.0.2, 127.0.0.3, ...
+
+    Loopback has no broadcast, so the fleet also listens on
+    ``broadcast_address`` and answers discovery probes sent there.
+    """
+
+    def __init__(
+        self,
+        count: int = 1,
+        conditions: NetworkConditions | None = None,
+        port: int = DEVICE_PORT,
+        broadcast_address: str = "127.0.0.1",
+        seed: int | None = None,
+    ) -> None:
+        if not 0 < count < 250:
+            raise ValueError("An emulator supports 1 to 249 devices")
+        rng = random.Random(seed)
+        self.port = port
+        self.broadcast_address = broadcast_address
+        self.devices = [
+            EmulatedDevice("H806SB", (0x0C3900 + index).to_bytes(3, "big"), conditions, rng)
+            for index in range(count)
+        ]
+        self._transports: list[asyncio.DatagramTransport] = []
+
+    @property
+    def hosts(self) -> list[str]:
+        """Return the IP address of every device."""
+        return [f"127.0.0.{index + 2}" for index in range(len(self.devices))]
+
+    async def async_start(self) -> None:
+        """Open one socket per device plus the broadcast responder."""
+        loop = asyncio.get_running_loop()
+        for host, device in zip(self.hosts, self.devices):
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda device=device: device, local_addr=(host, self.port)
+            )
+            self._transports.append(transport)
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _BroadcastResponder(self.devices),
+            local_addr=(self.broadcast_address, self.port),
+        )
+        self._transports.append(transport)
+        _LOGGER.debug("Emulating %d device(s) on port %d", len(self.devices), self.port)
+
+    def close(self) -> None:
+        """Close every socket of the fleet."""
+        for transport in self._transports:
+            transport.close()
+        self._transports.clear()
+
+    async def __aenter__(self) -> H806SBEmulator:
+        await self.async_start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,468 @@
+"""Home Assistant setup of the H806SB Led Controller integration.
+
+Loaded through the package ``__init__`` on first access, see there.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components import network
+from homeassistant.config_entries import SOURCE_INTEGRATION_DISCOVERY
+from homeassistant.core import (
+    Event,
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.const import (
+    ATTR_ENTITY_ID,
+    CONF_FILENAME,
+    EVENT_HOMEASSISTANT_STOP,
+)
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import discovery_flow, entity_registry as er
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.util import dt as dt_util
+
+from .audio import DEFAULT_FPS, AudioReactiveSource
+from .cache import H806SBDeviceCache
+from .capture import PacketCapture
+from .const import (
+    CONF_MISS_THRESHOLD,
+    CONF_SEND_INTERVAL,
+    CONF_EXTRA_SUBNETS,
+    CONF_SOURCE,
+    DATA_AUDIO,
+    DATA_CACHE,
+    DATA_EFFECTS,
+    DATA_STREAMS,
+    DATA_SUBNETS,
+    DATA_SWEEP,
+    DATA_TRANSITIONS,
+    DATA_TRANSPORT,
+    DEFAULT_MISS_THRESHOLD,
+    DEFAULT_SEND_INTERVAL,
+    DISCOVERY_INTERVAL,
+    DOMAIN,
+    SERVICE_EXPORT_CAPTURE,
+    SERVICE_START_AUDIO,
+    SERVICE_START_STREAM,
+    SERVICE_STOP_AUDIO,
+    SERVICE_STOP_STREAM,
+)
+from .controller import LedController
+from .coordinator import (
+    H806SBConfigEntry,
+    H806SBCoordinator,
+    H806SBRuntimeData,
+    H806SBSweepCoordinator,
+    unique_id_prefix,
+)
+from .discovery import (
+    DEFAULT_DISCOVERY_TIMEOUT,
+    DEFAULT_UNICAST_RATE,
+    H806SBDiscovery,
+    SubnetSweep,
+    parse_subnet,
+)
+from .stream import PixelStream, async_stream_source
+from .transport import H806SBTransport
+
+_LOGGER = logging.getLogger(__name__)
+_PLATFORMS: list[str] = ["light", "sensor"]
+
+def _subnet(value: Any) -> str:
+    """Validate an IPv4 subnet."""
+    try:
+        return str(parse_subnet(cv.string(value)))
+    except ValueError as err:
+        raise vol.Invalid(str(err)) from err
+
+CONFIG_SCHEMA = vol.Schema(
+    {
+        DOMAIN: vol.Schema({
+            # Subnets no broadcast reaches (routed VLANs), swept by unicast
+            vol.Optional(CONF_EXTRA_SUBNETS, default=[]): vol.All(cv.ensure_list, [_subnet]),
+        })
+    },
+    extra=vol.ALLOW_EXTRA,
+)
+
+EXPORT_CAPTURE_SCHEMA = vol.Schema({vol.Optional(CONF_FILENAME): cv.string})
+START_AUDIO_SCHEMA = vol.Schema({
+    vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+    vol.Required(CONF_SOURCE): cv.string,
+    vol.Optional("fps", default=DEFAULT_FPS): vol.All(vol.Coerce(int), vol.Range(min=1, max=60)),
+})
+START_STREAM_SCHEMA = vol.Schema({
+    vol.Required(ATTR_ENTITY_ID): cv.entity_id,
+    vol.Required(CONF_SOURCE): cv.string,
+    # The stream header holds the frame size in 16 bits
+    vol.Required("pixels"): vol.All(vol.Coerce(int), vol.Range(min=1, max=0xFFFF // 3)),
+    vol.Optional("fps", default=DEFAULT_FPS): vol.All(vol.Coerce(int), vol.Range(min=1, max=60)),
+})
+STOP_STREAM_SCHEMA = vol.Schema({vol.Optional(ATTR_ENTITY_ID): cv.entity_ids})
+
+async def async_setup(hass: HomeAssistant, config: dict):
+    """Setting integration by configuration.yaml."""
+    # One sweep for every discovery, so each scan resumes where the last stopped
+    subnets = hass.data[DATA_SUBNETS] = SubnetSweep(
+        config.get(DOMAIN, {}).get(CONF_EXTRA_SUBNETS, [])
+    )
+    if (scans := subnets.scans_to_cover(DEFAULT_UNICAST_RATE, DEFAULT_DISCOVERY_TIMEOUT)) > 1:
+        _LOGGER.warning(
+            "The extra subnets have %d hosts, more than one discovery scan probes; "
+            "covering them all takes %d scans. Use smaller subnets to find devices sooner",
+            subnets.size,
+            scans,
+        )
+    cache = hass.data[DATA_CACHE] = H806SBDeviceCache(hass)
+    await cache.async_load()
+
+    async def _async_rescan(*_) -> None:
+        await async_scan_devices(hass)
+
+    # Periodically look for new controllers and offer them to the user
+    hass.async_create_background_task(_async_rescan(), f"{DOMAIN}_discovery")
+    async_track_time_interval(hass, _async_rescan, DISCOVERY_INTERVAL, cancel_on_shutdown=True)
+
+    async def _async_export_capture(call: ServiceCall) -> ServiceResponse:
+        """Write the packet capture to a pcap file in the config directory."""
+        transport = hass.data.get(DATA_TRANSPORT)
+        if transport is None or transport.capture is None:
+            raise HomeAssistantError("No packet capture is running")
+        capture = transport.capture
+        filename = call.data.get(CONF_FILENAME) or f"h806sb_{dt_util.now():%Y%m%d_%H%M%S}.pcap"
+        # Only a file name, the capture always goes to the config directory
+        path = hass.config.path(os.path.basename(filename))
+        await hass.async_add_executor_job(_write_file, path, capture.to_pcap())
+        _LOGGER.info("Exported %d packet(s) to %s", len(capture), path)
+        return {"path": path, "packets": len(capture)}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_CAPTURE,
+        _async_export_capture,
+        schema=EXPORT_CAPTURE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def _async_start_audio(call: ServiceCall) -> None:
+        """Drive lights from an audio source, replacing a running session."""
+        source = call.data[CONF_SOURCE]
+        if not source.startswith("unix:") and not hass.config.is_allowed_path(source):
+            raise HomeAssistantError(f"Access to {source} is not allowed")
+        controllers = _async_controllers(hass, call.data[ATTR_ENTITY_ID])
+        if not controllers:
+            raise HomeAssistantError("No H806SB light selected")
+        await _async_stop_audio(call)
+        # Streams, rendered effects and fades would fight with the audio frames
+        await async_release_controllers(hass, controllers)
+        _async_stop_animations(hass, controllers)
+        session = AudioReactiveSource(controllers, source, fps=call.data["fps"])
+        try:
+            await session.async_start()
+        except (OSError, RuntimeError) as err:
+            raise HomeAssistantError(f"Could not start audio-reactive mode: {err}") from err
+        hass.data[DATA_AUDIO] = session
+
+    async def _async_stop_audio(*_) -> None:
+        if (session := hass.data.pop(DATA_AUDIO, None)) is not None:
+            await session.async_stop()
+            _LOGGER.debug("Audio-reactive mode stopped: %s", session.metrics.as_dict())
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_START_AUDIO, _async_start_audio, schema=START_AUDIO_SCHEMA
+    )
+    hass.services.async_register(DOMAIN, SERVICE_STOP_AUDIO, _async_stop_audio)
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_stop_audio)
+
+    async def _async_start_stream(call: ServiceCall) -> None:
+        """Stream raw RGB frames from a source to one light (experimental)."""
+        source = call.data[CONF_SOURCE]
+        if not source.startswith("unix:") and not hass.config.is_allowed_path(source):
+            raise HomeAssistantError(f"Access to {source} is not allowed")
+        controllers = _async_controllers(hass, [call.data[ATTR_ENTITY_ID]])
+        if not controllers:
+            raise HomeAssistantError("No H806SB light selected")
+        await async_release_controllers(hass, controllers)
+        _async_stop_animations(hass, controllers)
+        controller, fps = controllers[0], call.data["fps"]
+        try:
+            stream = PixelStream(controller, call.data["pixels"], fps=fps)
+        except ValueError as err:
+            raise HomeAssistantError(str(err)) from err
+        _LOGGER.warning(
+            "Pixel streaming to %s is experimental: its packet format is not "
+            "verified against the hardware yet",
+            controller.host,
+        )
+        await stream.async_start()
+        task = hass.async_create_background_task(
+            async_stream_source(stream, source, fps), f"{DOMAIN}_stream_{controller.host}"
+        )
+        streams = hass.data.setdefault(DATA_STREAMS, {})
+        streams[controller] = (stream, task)
+
+        def _stream_done(task) -> None:
+            stream.stop()
+            if streams.get(controller, (None,))[0] is stream:
+                del streams[controller]
+            if task.cancelled():
+                return
+            if (err := task.exception()) is not None:
+                _LOGGER.error("Pixel stream from %s failed: %s", source, err)
+            else:
+                _LOGGER.debug("Pixel stream from %s ended after %d frames", source, task.result())
+
+        task.add_done_callback(_stream_done)
+
+    async def _async_stop_stream(call: ServiceCall) -> None:
+        streams = hass.data.get(DATA_STREAMS, {})
+        if ATTR_ENTITY_ID in call.data:
+            controllers = _async_controllers(hass, call.data[ATTR_ENTITY_ID])
+        else:
+            controllers = list(streams)
+        for controller in controllers:
+            if (running := streams.pop(controller, None)) is not None:
+                running[1].cancel()
+
+    @callback
+    def _async_stop_streams(*_) -> None:
+        for _, task in hass.data.pop(DATA_STREAMS, {}).values():
+            task.cancel()
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_START_STREAM, _async_start_stream, schema=START_STREAM_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_STOP_STREAM, _async_stop_stream, schema=STOP_STREAM_SCHEMA
+    )
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_stop_streams)
+    return True
+
+async def async_release_controllers(hass: HomeAssistant, controllers: list[LedController]) -> None:
+    """Take controllers out of the audio session and stop their pixel streams.
+
+    Both send a frame about every 33 ms, which would overwrite any other
+    command. An audio session left without controllers stops.
+    """
+    streams = hass.data.get(DATA_STREAMS, {})
+    for controller in controllers:
+        if (running := streams.pop(controller, None)) is not None:
+            running[1].cancel()
+    if (session := hass.data.get(DATA_AUDIO)) is None:
+        return
+    if any([session.release(controller) for controller in controllers]) and not session.controllers:
+        hass.data.pop(DATA_AUDIO, None)
+        await session.async_stop()
+
+@callback
+def _async_stop_animations(hass: HomeAssistant, controllers: list[LedController]) -> None:
+    """Stop the rendered effects and fades of controllers."""
+    if (effects := hass.data.get(DATA_EFFECTS)) is not None:
+        for controller in controllers:
+            effects.stop(controller)
+    if (transitions := hass.data.get(DATA_TRANSITIONS)) is not None:
+        for controller in controllers:
+            transitions.cancel(controller)
+
+@callback
+def _async_controllers(hass: HomeAssistant, entity_ids: list[str]) -> list[LedController]:
+    """Return the controllers behind H806SB light entities."""
+    registry = er.async_get(hass)
+    controllers = []
+    for entity_id in entity_ids:
+        entity = registry.async_get(entity_id)
+        entry = hass.config_entries.async_get_entry(entity.config_entry_id) if entity else None
+        if entry is None or entry.domain != DOMAIN or getattr(entry, "runtime_data", None) is None:
+            _LOGGER.warning("%s is not an H806SB light, skipped", entity_id)
+            continue
+        controllers.append(entry.runtime_data.controller)
+    return controllers
+
+def _write_file(path: str, data: bytes) -> None:
+    with open(path, "wb") as file:
+        file.write(data)
+
+async def async_get_transport(hass: HomeAssistant) -> H806SBTransport:
+    """Return the UDP transport shared by every controller."""
+    if (transport := hass.data.get(DATA_TRANSPORT)) is None:
+        transport = hass.data[DATA_TRANSPORT] = H806SBTransport()
+        # Always on: recording is one tuple per datagram, formatting only on export
+        transport.capture = PacketCapture()
+
+        @callback
+        def _close_transport(event: Event) -> None:
+            if hass.data.get(DATA_TRANSPORT) is transport:
+                hass.data.pop(DATA_TRANSPORT)
+            transport.close()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _close_transport)
+        # Every reply seen on the network refreshes the device cache
+        if (cache := hass.data.get(DATA_CACHE)) is not None:
+            transport.add_listener(cache.async_handle_reply)
+    await transport.async_start()
+    return transport
+
+async def async_scan_devices(hass: HomeAssistant) -> None:
+    """Broadcast one discovery round and start a flow for every reply."""
+    discovery = await async_get_discovery(hass)
+    try:
+        async for device in discovery.async_discover():
+            discovery_flow.async_create_flow(
+                hass,
+                DOMAIN,
+                context={"source": SOURCE_INTEGRATION_DISCOVERY},
+                data={"ip": device.ip, "serial": device.serial.hex(), "name": device.name},
+            )
+    except Exception as err:
+        _LOGGER.warning("Background discovery failed: %s", err)
+
+@callback
+def async_get_sweep(hass: HomeAssistant) -> H806SBSweepCoordinator:
+    """Return the availability sweep shared by every entry."""
+    if (sweep := hass.data.get(DATA_SWEEP)) is None:
+        sweep = hass.data[DATA_SWEEP] = H806SBSweepCoordinator(
+            hass, hass.data[DATA_TRANSPORT], lambda: async_get_discovery(hass)
+        )
+    return sweep
+
+async def async_get_discovery(hass: HomeAssistant) -> H806SBDiscovery:
+    """Return a discovery covering every local network and the extra subnets.
+
+    Directed broadcasts reach each network of a multi-homed host, where
+    the limited broadcast only leaves through the default route.
+    """
+    broadcasts = await network.async_get_ipv4_broadcast_addresses(hass)
+    return H806SBDiscovery(
+        await async_get_transport(hass),
+        broadcast_addresses=[str(address) for address in broadcasts],
+        subnets=hass.data.get(DATA_SUBNETS, ()),
+    )
+
+async def async_setup_entry(hass: HomeAssistant, entry: H806SBConfigEntry):
+    """Setting up from a config entry."""
+    start = time.monotonic()
+
+    config = {**entry.data, **entry.options}
+    if entry.options:
+        hass.config_entries.async_update_entry(entry, data=config, options={})
+
+    _LOGGER.debug("Initializing H806SB controller entry (%s)", config)
+
+    cache = hass.data.get(DATA_CACHE)
+    serial = bytes.fromhex(config["serial_number"]) if "serial_number" in config else None
+    # The device may have moved while Home Assistant was down
+    if cache is not None and serial is not None and (record := cache.get(serial)):
+        if not LedController.compare_ips(record["ip"], config["host"]):
+            _LOGGER.info("%s moved from %s to %s", entry.title, config["host"], record["ip"])
+            config["host"] = record["ip"]
+            hass.config_entries.async_update_entry(entry, data=config)
+
+    controller = LedController(
+        host=config["host"],
+        transport=await async_get_transport(hass),
+        min_interval=config.get(CONF_SEND_INTERVAL, DEFAULT_SEND_INTERVAL),
+    )
+    if serial is not None:
+        controller.set_serial_number(config["serial_number"])
+
+    # Create coordinator for periodically check
+    @callback
+    def _async_address_changed(ip: str) -> None:
+        # A data-only update, the update listener does not reload the entry
+        _LOGGER.info("%s moved to %s", entry.title, ip)
+        hass.config_entries.async_update_entry(entry, data={**entry.data, "host": ip})
+
+    sweep = async_get_sweep(hass)
+    coordinator = H806SBCoordinator(
+        hass,
+        controller,
+        sweep,
+        miss_threshold=config.get(CONF_MISS_THRESHOLD, DEFAULT_MISS_THRESHOLD),
+        cache=cache,
+        serial=serial,
+        on_address_change=_async_address_changed,
+    )
+    # Any reply seen on the shared socket counts as liveness, and the
+    # broadcast sweep shared by all entries reports missing devices
+    entry.async_on_unload(hass.data[DATA_TRANSPORT].add_listener(coordinator.async_handle_reply))
+    # Setup never waits for the device: a recently seen one starts available,
+    # any other with unknown availability, and the first probe of every
+    # entry runs in the background at the same time
+    coordinator.async_seed(True if _recently_seen(cache, serial) else None)
+    entry.async_on_unload(sweep.async_add_listener(coordinator.async_handle_sweep))
+
+    entry.runtime_data = H806SBRuntimeData(controller, coordinator, serial)
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+
+    async def _async_first_probe() -> None:
+        await coordinator.async_refresh()
+        entry.runtime_data.first_probe_seconds = time.monotonic() - start
+        _LOGGER.debug(
+            "Entry %s first probe done %.3f s after setup started (available: %s)",
+            entry.title, entry.runtime_data.first_probe_seconds, coordinator.available,
+        )
+
+    entry.async_create_background_task(
+        hass, _async_first_probe(), f"{DOMAIN}_first_probe_{entry.entry_id}"
+    )
+
+    """Settings integration by UI."""
+    await hass.config_entries.async_forward_entry_setups(entry, _PLATFORMS)
+
+    entry.runtime_data.startup_seconds = time.monotonic() - start
+    _LOGGER.debug(
+        "Entry %s ready in %.3f s (poll cost so far %.3f s in %d polls)",
+        entry.title, entry.runtime_data.startup_seconds,
+        coordinator.poll_seconds, coordinator.poll_count,
+    )
+    return True
+
+
+def _recently_seen(cache: H806SBDeviceCache | None, serial: bytes | None) -> bool:
+    """Return True if the device answered within CACHE_MAX_AGE."""
+    return cache is not None and serial is not None and cache.recently_seen(serial)
+
+
+async def async_migrate_entry(hass: HomeAssistant, entry: H806SBConfigEntry) -> bool:
+    """Migrate old entries."""
+    if entry.version == 1:
+        # Entities were keyed by host, they follow the serial now
+        old_prefix = f"h806sb_{entry.data['host']}"
+        new_prefix = unique_id_prefix(entry.data)
+
+        @callback
+        def _migrate_unique_id(entity_entry: er.RegistryEntry) -> dict | None:
+            unique_id = entity_entry.unique_id
+            if unique_id == old_prefix or unique_id.startswith(f"{old_prefix}_"):
+                return {"new_unique_id": new_prefix + unique_id[len(old_prefix):]}
+            return None
+
+        await er.async_migrate_entries(hass, entry.entry_id, _migrate_unique_id)
+        hass.config_entries.async_update_entry(entry, version=2)
+        _LOGGER.debug("Migrated %s to version 2", entry.title)
+    return True
+
+
+async def _async_update_listener(hass: HomeAssistant, entry: H806SBConfigEntry) -> None:
+    """Reload the entry when the options flow saved new options."""
+    if entry.options:
+        await hass.config_entries.async_reload(entry.entry_id)
+
+
+async def async_unload_entry(hass: HomeAssistant, entry: H806SBConfigEntry) -> bool:
+    """Upload integrations."""
+    if unload_ok := await hass.config_entries.async_unload_platforms(entry, _PLATFORMS):
+        await entry.runtime_data.controller.async_close()
+    return unload_ok
@@ -1,73 +1,139 @@
 from __future__ import annotations
 
+import asyncio
+from typing import Any
+
+import voluptuous as vol
+
 from homeassistant.components.light import (
     LightEntity,
     ColorMode,
     ATTR_BRIGHTNESS,
+    ATTR_EFFECT,
     ATTR_RGB_COLOR,
+    ATTR_TRANSITION,
+    EFFECT_OFF,
+    PLATFORM_SCHEMA,
+    LightEntityFeature,
 )
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.const import CONF_ENTITIES, CONF_NAME, CONF_UNIQUE_ID, STATE_ON, STATE_UNAVAILABLE
+from homeassistant.core import Event, HomeAssistant, callback
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.event import async_track_state_change_event
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity,
-    DataUpdateCoordinator
+    DataUpdateCoordinator,
 )
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
 
-from .controller import LedController
-from .const import DOMAIN, TRACK_INTERVAL
+from .color import (
+    DEFAULT_BRIGHTNESS_GAMMA,
+    DEFAULT_GAMMA,
+    DEFAULT_STRIP_TYPE,
+    ColorPipeline,
+)
+from .controller import LedController, async_send_burst
+from .const import (
+    CONF_BRIGHTNESS_GAMMA,
+    CONF_GAMMA,
+    CONF_STRIP_TYPE,
+    DATA_EFFECTS,
+    DATA_TRANSITIONS,
+    DOMAIN,
+)
+from .coordinator import H806SBConfigEntry, unique_id_prefix
+from .effects import GROUP_EFFECTS, LIGHT_EFFECTS, EffectEngine
+from .integration import async_release_controllers
+from .transition import FrameClock, TransitionEngine
 import logging
-from datetime import timedelta
 
 _LOGGER = logging.getLogger(__name__)
 
+DEFAULT_GROUP_NAME = "H806SB Group"
+
+PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend({
+    vol.Optional(CONF_NAME, default=DEFAULT_GROUP_NAME): cv.string,
+    vol.Optional(CONF_UNIQUE_ID): cv.string,
+    vol.Required(CONF_ENTITIES): cv.entities_domain("light"),
+})
+
+@callback
+def _async_get_transitions(hass: HomeAssistant) -> TransitionEngine:
+    """Return the transition engine shared by every light."""
+    if (engine := hass.data.get(DATA_TRANSITIONS)) is None:
+        engine = hass.data[DATA_TRANSITIONS] = TransitionEngine(FrameClock())
+    return engine
+
+@callback
+def _async_get_effects(hass: HomeAssistant) -> EffectEngine:
+    """Return the effect engine shared by every light."""
+    if (engine := hass.data.get(DATA_EFFECTS)) is None:
+        engine = hass.data[DATA_EFFECTS] = EffectEngine()
+    return engine
+
+def _requested_effect(kwargs: dict[str, Any], current: str | None) -> str | None:
+    """Effect to show after a turn-on, None for a steady light."""
+    effect = kwargs.get(ATTR_EFFECT, current)
+    return None if effect == EFFECT_OFF else effect
+
+async def async_setup_platform(
+    hass: HomeAssistant,
+    config: ConfigType,
+    async_add_entities: AddEntitiesCallback,
+    discovery_info: DiscoveryInfoType | None = None,
+) -> None:
+    """Setting up a group of H806SB lights from configuration.yaml."""
+    async_add_entities([
+        H806SBGroupLight(config[CONF_NAME], config.get(CONF_UNIQUE_ID), config[CONF_ENTITIES])
+    ])
+
 async def async_setup_entry(
     hass: HomeAssistant,
-    entry: ConfigEntry,
+    entry: H806SBConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Setting up the light platform."""
-    config = entry.data
-    
-    # Create a controller and set the serial number
-    controller = LedController(host=config["host"])
-    if "serial_number" in config:
-        controller.set_serial_number(config["serial_number"])
-    
-    # Create a coordinator to check the device status
-    coordinator = H806SBCoordinator(hass, controller)
-    await coordinator.async_config_entry_first_refresh()
-    
-    async_add_entities([H806SBLight(coordinator, controller, config)])
+    data = entry.runtime_data
 
-class H806SBCoordinator(DataUpdateCoordinator):
-    """Coordinator for checking the device status."""
-    
-    def __init__(self, hass: HomeAssistant, controller: LedController):
-        super().__init__(
-            hass,
-            _LOGGER,
-            name="H806SB Device Status",
-            update_interval=TRACK_INTERVAL
-        )
-        self.controller = controller
-    
-    async def _async_update_data(self) -> dict[str, Any]:
-        """Checking device availability."""
-        try:
-            available = await self.controller.async_check_availability()
-            _LOGGER.debug(f"available:{available}")
-            return {"available": available}
-        except Exception as err:
-            _LOGGER.error("Error checking device status: %s", err)
-            raise UpdateFailed(f"Error communicating with device: {err}")
+    light = H806SBLight(data.coordinator, data.controller, entry.data)
+    # Groups look member lights up by config entry
+    data.light = light
+    async_add_entities([light])
+
+class ChangeOnlyStateMixin:
+    """Skip state writes that would not change the state or its attributes.
 
-class H806SBLight(CoordinatorEntity, LightEntity):
+    Every write becomes a state_changed event and a recorder row, even when
+    nothing changed; the counters show how many writes were saved.
+    """
+
+    _last_written: tuple | None = None
+    state_writes = 0
+    suppressed_writes = 0
+
+    @callback
+    def async_write_state_if_changed(self) -> None:
+        """Write the state only if it differs from the last written one."""
+        snapshot = (self.available, self.state, self.state_attributes, self.extra_state_attributes)
+        if snapshot == self._last_written:
+            self.suppressed_writes += 1
+            return
+        self._last_written = snapshot
+        self.state_writes += 1
+        self.async_write_ha_state()
+
+
+class H806SBLight(ChangeOnlyStateMixin, CoordinatorEntity, LightEntity):
     """Implementation of H806SB light control."""
     
     _attr_color_mode = ColorMode.RGB
     _attr_supported_color_modes = {ColorMode.RGB}
+    _attr_supported_features = LightEntityFeature.TRANSITION | LightEntityFeature.EFFECT
+    # EFFECT_OFF lets the UI clear an effect without turning the light off
+    _attr_effect_list = [EFFECT_OFF, *LIGHT_EFFECTS]
     
     def __init__(
         self,
@@ -80,34 +146,78 @@ class H806SBLight(CoordinatorEntity, LightEntity):
         self._controller = controller
         self._config = config
         self._attr_name = config.get("name", "H806SB Light")
-        self._attr_unique_id = f"h806sb_{config['host']}"
-        self._attr_is_on = False
+        self._attr_unique_id = unique_id_prefix(config)
+        # The device state is not known until the first command
+        self._attr_is_on = None
         self._attr_brightness = 255
         self._attr_rgb_color = (255, 255, 255)
+        self._attr_effect = None
         self._default_speed = 20
+        self._pipeline = ColorPipeline(
+            gamma=config.get(CONF_GAMMA, DEFAULT_GAMMA),
+            strip_type=config.get(CONF_STRIP_TYPE, DEFAULT_STRIP_TYPE),
+            brightness_gamma=config.get(CONF_BRIGHTNESS_GAMMA, DEFAULT_BRIGHTNESS_GAMMA),
+        )
 
     async def async_added_to_hass(self) -> None:
         """When adding to home assistant"""
         await super().async_added_to_hass()
         self._handle_coordinator_update()
 
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop animating the device once the entity is gone."""
+        await super().async_will_remove_from_hass()
+        _async_get_transitions(self.hass).cancel(self._controller)
+        _async_get_effects(self.hass).stop(self._controller)
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handling data from coordinator."""
-        self._attr_available = self.coordinator.data.get("available", False)
-        self.async_write_ha_state()
+        # Unknown availability (None) before the first probe counts as available
+        self._attr_available = self.coordinator.data.get("available") is not False
+        self.async_write_state_if_changed()
 
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn on light with parameters."""
         if not self._attr_available:
             raise HomeAssistantError("Device is not available")
+        await async_release_controllers(self.hass, [self._controller])
         
         brightness = kwargs.get(ATTR_BRIGHTNESS, self._attr_brightness)
-        device_brightness = int((brightness / 255) * 31)
+        device_brightness = self._pipeline.device_brightness(brightness)
         
         if ATTR_RGB_COLOR in kwargs:
             self._attr_rgb_color = kwargs[ATTR_RGB_COLOR]
-            #TODO RGB Handling
+            # Only stored: the control packet has no colour field
+
+        engine = _async_get_transitions(self.hass)
+        effects = _async_get_effects(self.hass)
+        if effect := _requested_effect(kwargs, self._attr_effect):
+            engine.cancel(self._controller)
+            effects.start(effect, [self._controller], device_brightness, self._default_speed)
+            self._attr_is_on = True
+            self._attr_brightness = brightness
+            self._attr_effect = effect
+            self.async_write_state_if_changed()
+            return
+
+        effects.stop(self._controller)
+        self._attr_effect = None
+        if kwargs.get(ATTR_TRANSITION):
+            engine.start(
+                self._controller,
+                self._device_level(),
+                device_brightness,
+                kwargs[ATTR_TRANSITION],
+                self._default_speed,
+            )
+            self._attr_is_on = True
+            self._attr_brightness = brightness
+            self.async_write_state_if_changed()
+            return
+
+        # An instant change replaces a running fade
+        engine.cancel(self._controller)
         try:
             success = await self._controller.async_send_packet(
                 brightness=device_brightness,
@@ -119,7 +229,7 @@ class H806SBLight(CoordinatorEntity, LightEntity):
                 
             self._attr_is_on = True
             self._attr_brightness = brightness
-            self.async_write_ha_state()
+            self.async_write_state_if_changed()
             
         except Exception as err:
             _LOGGER.error(f"Error turning on light:{err}")
@@ -129,24 +239,224 @@ class H806SBLight(CoordinatorEntity, LightEntity):
         """Turn Off Light."""
         if not self._attr_available:
             raise HomeAssistantError("Device is not available")
-            
+        await async_release_controllers(self.hass, [self._controller])
+
+        _async_get_effects(self.hass).stop(self._controller)
+        self._attr_effect = None
+        engine = _async_get_transitions(self.hass)
+        if kwargs.get(ATTR_TRANSITION):
+            engine.start(
+                self._controller,
+                self._device_level(),
+                0,
+                kwargs[ATTR_TRANSITION],
+                self._default_speed,
+                on_done=self._async_confirm_off,
+            )
+            self._attr_is_on = False
+            self.async_write_state_if_changed()
+            return
+
+        engine.cancel(self._controller)
         try:
+            # Turn-off must not get lost, confirm it with a status probe
             success = await self._controller.async_send_packet(
                 brightness=0,
                 speed=20,
-                is_on=True
+                is_on=True,
+                reliable=True,
             )
             if not success:
                 raise HomeAssistantError("Failed to send command to device")
                 
             self._attr_is_on = False
-            self.async_write_ha_state()
+            self.async_write_state_if_changed()
             
         except Exception as err:
             _LOGGER.error("Error turning off light: %s", err)
             raise HomeAssistantError(f"Error turning off light: {err}")
 
-    async def async_will_remove_from_hass(self) -> None:
-        """Clearing during integration deletion."""
-        await super().async_will_remove_from_hass()
-        await self._controller.async_close()
\ No newline at end of file
+    def _device_level(self) -> int:
+        """Device brightness the light shows now, when no fade is running."""
+        return self._pipeline.device_brightness(self._attr_brightness) if self._attr_is_on else 0
+
+    @callback
+    def _async_confirm_off(self) -> None:
+        """Resend the end of a fade-out as a confirmed turn-off."""
+        self.hass.async_create_task(
+            self._controller.async_send_packet(0, self._default_speed, True, reliable=True)
+        )
+
+    @callback
+    def async_apply_group_state(
+        self, is_on: bool, brightness: int | None, effect: str | None = None
+    ) -> None:
+        """Take over a state sent to the device by a group."""
+        self._attr_is_on = is_on
+        self._attr_effect = effect
+        if brightness is not None:
+            self._attr_brightness = brightness
+        self.async_write_state_if_changed()
+
+
+class H806SBGroupLight(ChangeOnlyStateMixin, LightEntity):
+    """Group of H806SB lights switched together in one burst.
+
+    All packets are built before the first one is sent, so the members
+    change within the skew reported in ``last_skew_ms``.
+    """
+
+    _attr_color_mode = ColorMode.BRIGHTNESS
+    _attr_supported_color_modes = {ColorMode.BRIGHTNESS}
+    _attr_supported_features = LightEntityFeature.TRANSITION | LightEntityFeature.EFFECT
+    _attr_effect_list = [EFFECT_OFF, *GROUP_EFFECTS]
+    _attr_should_poll = False
+
+    def __init__(self, name: str, unique_id: str | None, entity_ids: list[str]) -> None:
+        """Initialization."""
+        self._attr_name = name
+        self._attr_unique_id = unique_id
+        self._entity_ids = entity_ids
+        self._attr_is_on = False
+        self._attr_brightness = 255
+        self._attr_effect = None
+        self._default_speed = 20
+        self._last_skew: float | None = None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Group members and the worst-case skew of the last burst."""
+        return {
+            "entity_id": self._entity_ids,
+            "last_skew_ms": None if self._last_skew is None else round(self._last_skew * 1000, 3),
+        }
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the state of the members."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_track_state_change_event(self.hass, self._entity_ids, self._async_member_changed)
+        )
+        self._update_from_members()
+
+    @callback
+    def _async_member_changed(self, event: Event) -> None:
+        self._update_from_members()
+        self.async_write_state_if_changed()
+
+    @callback
+    def _update_from_members(self) -> None:
+        states = [s for e in self._entity_ids if (s := self.hass.states.get(e)) is not None]
+        on_states = [s for s in states if s.state == STATE_ON]
+        self._attr_available = any(s.state != STATE_UNAVAILABLE for s in states)
+        self._attr_is_on = bool(on_states)
+        levels = [s.attributes[ATTR_BRIGHTNESS] for s in on_states if s.attributes.get(ATTR_BRIGHTNESS) is not None]
+        if levels:
+            self._attr_brightness = round(sum(levels) / len(levels))
+
+    def _members(self) -> list[H806SBLight]:
+        """Return the available member lights of this integration."""
+        registry = er.async_get(self.hass)
+        members = []
+        for entity_id in self._entity_ids:
+            entity = registry.async_get(entity_id)
+            entry = self.hass.config_entries.async_get_entry(entity.config_entry_id) if entity else None
+            if entry is None or entry.domain != DOMAIN or getattr(entry, "runtime_data", None) is None:
+                _LOGGER.warning("%s is not an H806SB light, skipped", entity_id)
+                continue
+            if (light := entry.runtime_data.light) and light.available:
+                members.append(light)
+        return members
+
+    async def _async_send(
+        self,
+        is_on: bool,
+        brightness: int | None,
+        transition: float | None,
+        effect: str | None = None,
+    ) -> None:
+        members = self._members()
+        if not members:
+            raise HomeAssistantError("No group member is available")
+        await async_release_controllers(self.hass, [light._controller for light in members])
+        engine = _async_get_transitions(self.hass)
+        effects = _async_get_effects(self.hass)
+        # Members may use different colour options, so each one maps the brightness
+        levels = {
+            light: light._pipeline.device_brightness(brightness) if is_on else 0
+            for light in members
+        }
+        if effect:
+            # One effect for all members keeps them in step; it runs at the
+            # brightest member level
+            for light in members:
+                engine.cancel(light._controller)
+            effects.start(
+                effect,
+                [light._controller for light in members],
+                max(levels.values()),
+                self._default_speed,
+            )
+            for light in members:
+                light.async_apply_group_state(True, brightness, effect)
+            return
+        for light in members:
+            effects.stop(light._controller)
+        if transition:
+            # Fades of all members render in the same frames, one burst each
+            for light in members:
+                engine.start(
+                    light._controller,
+                    light._device_level(),
+                    levels[light],
+                    transition,
+                    self._default_speed,
+                    on_done=None if is_on else light._async_confirm_off,
+                )
+                light.async_apply_group_state(is_on, brightness if is_on else None)
+            return
+        for light in members:
+            engine.cancel(light._controller)
+        commands = [
+            (light._controller, levels[light], self._default_speed, True)
+            for light in members
+        ]
+        try:
+            self._last_skew = await async_send_burst(commands)
+        except Exception as err:
+            _LOGGER.error("Error sending group command: %s", err)
+            raise HomeAssistantError(f"Error sending group command: {err}")
+        if not is_on:
+            # Turn-off must not get lost, as for a single light: every member
+            # confirms with a status probe, a miss resends reliably
+            confirmed = await asyncio.gather(
+                *(light._controller.async_confirm_last_sent() for light in members)
+            )
+            failed = [light for light, ok in zip(members, confirmed) if not ok]
+            for light in members:
+                if light not in failed:
+                    light.async_apply_group_state(False, None)
+            if failed:
+                raise HomeAssistantError(
+                    "Turn-off not confirmed by "
+                    + ", ".join(light.entity_id or light.name for light in failed)
+                )
+            return
+        for light in members:
+            light.async_apply_group_state(is_on, brightness)
+
+    async def async_turn_on(self, **kwargs: Any) -> None:
+        """Turn on all members with one burst."""
+        brightness = kwargs.get(ATTR_BRIGHTNESS, self._attr_brightness)
+        effect = _requested_effect(kwargs, self._attr_effect)
+        await self._async_send(True, brightness, kwargs.get(ATTR_TRANSITION), effect)
+        self._attr_brightness = brightness
+        self._attr_effect = effect
+        # The members wrote their states during the send, before these changes
+        self.async_write_state_if_changed()
+
+    async def async_turn_off(self, **kwargs: Any) -> None:
+        """Turn off all members with one burst."""
+        await self._async_send(False, None, kwargs.get(ATTR_TRANSITION))
+        self._attr_effect = None
+        self.async_write_state_if_changed()
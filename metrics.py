@@ -0,0 +1,99 @@
+"""Low-overhead performance counters of H806SB controllers."""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Any
+
+# Upper bounds of the RTT buckets in milliseconds, the last bucket is open
+RTT_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Return the value below which ``fraction`` of ``values`` lie, NaN when empty."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Histogram:
+    """Fixed-bucket histogram; observing a value is one bisect and two adds."""
+
+    __slots__ = ("bounds", "counts", "count", "total", "maximum")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Add one value."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.maximum:
+            self.maximum = value
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean of all values, None when empty."""
+        return self.total / self.count if self.count else None
+
+    def quantile(self, fraction: float) -> float | None:
+        """Return the bucket bound below which ``fraction`` of the values lie."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.maximum
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the histogram for diagnostics."""
+        labels = [f"<={bound}" for bound in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": self.maximum,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+@dataclass(slots=True)
+class ControllerMetrics:
+    """Counters of one LedController, updated in place on the hot path."""
+
+    packets_sent: int = 0
+    send_errors: int = 0
+    probes_sent: int = 0
+    probe_timeouts: int = 0
+    retransmits: int = 0
+    unconfirmed: int = 0
+    socket_inits: int = 0
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    availability_rtt_ms: Histogram = field(default_factory=lambda: Histogram(RTT_BUCKETS_MS))
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return all counters for diagnostics."""
+        return {
+            "packets_sent": self.packets_sent,
+            "send_errors": self.send_errors,
+            "probes_sent": self.probes_sent,
+            "probe_timeouts": self.probe_timeouts,
+            "retransmits": self.retransmits,
+            "unconfirmed": self.unconfirmed,
+            "socket_inits": self.socket_inits,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "availability_rtt_ms": self.availability_rtt_ms.as_dict(),
+        }
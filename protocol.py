@@ -0,0 +1,33 @@
+"""Public API of the H806SB protocol for scripts, without Home Assistant.
+
+Everything here is re-exported from the protocol modules, none of which
+imports Home Assistant::
+
+    from h806sb.protocol import H806SBTransport, LedController, async_send_burst
+
+One :class:`H806SBTransport` can serve any number of controllers; pass
+``connect=False`` to :class:`LedController` to send through it only.
+"""
+
+from __future__ import annotations
+
+from .codec import DISCOVERY_PACKET, PROBE_PACKET, decode_reply, serial_to_wire
+from .controller import LedController, async_send_burst
+from .discovery import DiscoveredDevice, H806SBDiscovery, parse_subnet
+from .transport import DEVICE_PORT, LISTEN_PORT, H806SBDeviceChannel, H806SBTransport
+
+__all__ = [
+    "DEVICE_PORT",
+    "DISCOVERY_PACKET",
+    "LISTEN_PORT",
+    "PROBE_PACKET",
+    "DiscoveredDevice",
+    "H806SBDeviceChannel",
+    "H806SBDiscovery",
+    "H806SBTransport",
+    "LedController",
+    "async_send_burst",
+    "decode_reply",
+    "parse_subnet",
+    "serial_to_wire",
+]
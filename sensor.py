@@ -0,0 +1,110 @@
+"""Diagnostic sensors of the H806SB Led Controller integration."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import timedelta
+
+from homeassistant.components.sensor import (
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .coordinator import H806SBConfigEntry, unique_id_prefix
+from .metrics import ControllerMetrics
+
+# Counters are read from memory, polling them costs no network traffic
+SCAN_INTERVAL = timedelta(seconds=60)
+
+
+@dataclass(frozen=True, kw_only=True)
+class H806SBSensorEntityDescription(SensorEntityDescription):
+    """Sensor reading one value of the controller metrics."""
+
+    value_fn: Callable[[ControllerMetrics], float | int | None]
+
+
+SENSORS: tuple[H806SBSensorEntityDescription, ...] = (
+    H806SBSensorEntityDescription(
+        key="packets_sent",
+        name="Packets sent",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.packets_sent,
+    ),
+    H806SBSensorEntityDescription(
+        key="send_errors",
+        name="Send errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.send_errors,
+    ),
+    H806SBSensorEntityDescription(
+        key="availability_rtt",
+        name="Availability RTT",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=1,
+        value_fn=lambda metrics: metrics.availability_rtt_ms.mean,
+    ),
+    H806SBSensorEntityDescription(
+        key="probe_timeouts",
+        name="Probe timeouts",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda metrics: metrics.probe_timeouts,
+    ),
+    H806SBSensorEntityDescription(
+        key="socket_inits",
+        name="Socket initializations",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_registry_enabled_default=False,
+        value_fn=lambda metrics: metrics.socket_inits,
+    ),
+    H806SBSensorEntityDescription(
+        key="queue_depth",
+        name="Peak command queue depth",
+        # A high-water mark, averaging it in long-term statistics means nothing
+        entity_registry_enabled_default=False,
+        value_fn=lambda metrics: metrics.max_queue_depth,
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: H806SBConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Setting up the diagnostic sensors."""
+    metrics = entry.runtime_data.controller.metrics
+    async_add_entities(
+        H806SBMetricSensor(entry, metrics, description) for description in SENSORS
+    )
+
+
+class H806SBMetricSensor(SensorEntity):
+    """One controller counter."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    entity_description: H806SBSensorEntityDescription
+
+    def __init__(
+        self,
+        entry: H806SBConfigEntry,
+        metrics: ControllerMetrics,
+        description: H806SBSensorEntityDescription,
+    ) -> None:
+        """Initialization."""
+        self.entity_description = description
+        self._metrics = metrics
+        name = entry.data.get("name", "H806SB Light")
+        self._attr_name = f"{name} {description.name}"
+        self._attr_unique_id = f"{unique_id_prefix(entry.data)}_{description.key}"
+
+    @property
+    def native_value(self) -> float | int | None:
+        """Read the counter."""
+        return self.entity_description.value_fn(self._metrics)
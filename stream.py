@@ -0,0 +1,243 @@
+"""Real-time pixel streaming to H806SB controllers.
+
+Frames are paced by a :class:`FrameClock`; when frames are pushed faster
+than the target rate, only the newest one is sent. Each frame is compared
+with the shadow of the last frame sent to the controller, and only the
+changed pixel ranges go out. A full frame is sent at a fixed interval, so
+a lost datagram does not leave stale pixels behind for long.
+
+Every datagram is built in one reusable buffer and sent as a memoryview
+slice of it; the socket copies what it cannot send right away.
+
+EXPERIMENTAL: the ``FB C2`` pixel packet (see codec.py) is modelled on
+the control packet and not yet verified against the hardware.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+from .audio import open_pcm
+from .codec import STREAM_HEADER_SIZE, encode_stream_header, set_stream_counter
+from .controller import LedController
+from .transition import FrameClock
+
+_LOGGER = logging.getLogger(__name__)
+
+BYTES_PER_PIXEL = 3
+# Payload per datagram, a multiple of 3 that stays below a Wi-Fi MTU
+DEFAULT_MAX_PAYLOAD = 1200
+# Interval between two full frames (seconds)
+DEFAULT_FULL_REFRESH = 1.0
+# Without NumPy, changes are located in blocks of this many pixels
+_BLOCK_PIXELS = 16
+
+
+def _changed_ranges(frame: bytearray, shadow: bytearray) -> list[tuple[int, int]]:
+    """Return the (start, end) byte ranges of the pixels that differ."""
+    if np is not None:
+        changed = (
+            np.frombuffer(frame, dtype=np.uint8) != np.frombuffer(shadow, dtype=np.uint8)
+        ).reshape(-1, BYTES_PER_PIXEL).any(axis=1)
+        # Rising and falling edges of the changed mask are the range bounds
+        edges = np.flatnonzero(np.diff(changed, prepend=False, append=False))
+        return [
+            (int(start) * BYTES_PER_PIXEL, int(end) * BYTES_PER_PIXEL)
+            for start, end in zip(edges[::2], edges[1::2])
+        ]
+    block = _BLOCK_PIXELS * BYTES_PER_PIXEL
+    ranges: list[tuple[int, int]] = []
+    for start in range(0, len(frame), block):
+        end = min(start + block, len(frame))
+        if frame[start:end] != shadow[start:end]:
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((start, end))
+    return ranges
+
+
+class PixelStream:
+    """Streams live RGB frames to one controller."""
+
+    def __init__(
+        self,
+        controller: LedController,
+        pixels: int,
+        fps: float = 30,
+        max_payload: int = DEFAULT_MAX_PAYLOAD,
+        clock: FrameClock | None = None,
+        full_refresh: float = DEFAULT_FULL_REFRESH,
+    ) -> None:
+        payload = max_payload - max_payload % BYTES_PER_PIXEL
+        if pixels <= 0 or payload <= 0:
+            raise ValueError("Stream needs at least one pixel and one pixel per datagram")
+        self.frame_size = pixels * BYTES_PER_PIXEL
+        if -(-self.frame_size // payload) > 256 or self.frame_size > 0xFFFF:
+            raise ValueError(f"{pixels} pixels do not fit the stream header")
+
+        self._controller = controller
+        self._clock = clock or FrameClock(fps)
+        self._payload = payload
+        self._serial = bytes(controller._serial_number)
+        self._full_refresh = full_refresh
+        self._full_datagrams = -(-self.frame_size // payload)
+        self._full_bytes = self.frame_size + self._full_datagrams * STREAM_HEADER_SIZE
+        self._frame = bytearray(self.frame_size)
+        self._frame_view = memoryview(self._frame)
+        self._buffer = bytearray(STREAM_HEADER_SIZE + payload)
+        self._view = memoryview(self._buffer)
+        # The shadow lives on the controller, next to its counter and serial
+        if controller.pixel_shadow is None or len(controller.pixel_shadow) != self.frame_size:
+            controller.pixel_shadow = None
+
+        self._counter = 0
+        self._dirty = False
+        self._unsubscribe = None
+        self._started: float | None = None
+        self._last_full: float | None = None
+        self.frames_pushed = 0
+        self.frames_sent = 0
+        self.full_frames = 0
+        self.datagrams_sent = 0
+        self.bytes_sent = 0
+        self.datagrams_saved = 0
+        self.bytes_saved = 0
+
+    @property
+    def running(self) -> bool:
+        """Return True while frames are being sent."""
+        return self._unsubscribe is not None
+
+    def push(self, frame) -> None:
+        """Take a new frame of ``pixels * 3`` RGB bytes.
+
+        Any C-contiguous buffer works: bytes, bytearray, memoryview or a
+        uint8 NumPy array. The frame is copied once.
+        """
+        source = memoryview(frame).cast("B")
+        if source.nbytes != self.frame_size:
+            raise ValueError(f"Frame has {source.nbytes} bytes, expected {self.frame_size}")
+        self._frame[:] = source
+        self._dirty = True
+        self.frames_pushed += 1
+
+    async def async_start(self) -> None:
+        """Start sending pushed frames at the target rate."""
+        if self.running:
+            return
+        await self._controller.async_initialize()
+        self._started = asyncio.get_running_loop().time()
+        self._unsubscribe = self._clock.subscribe(self._async_send_frame)
+
+    def stop(self) -> None:
+        """Stop sending; the controller returns to its playback on its own."""
+        if self._unsubscribe:
+            self._unsubscribe()
+            self._unsubscribe = None
+
+    def _segments(self, now: float) -> list[tuple[int, int]]:
+        """Byte ranges to send this frame, each at most one payload long."""
+        shadow = self._controller.pixel_shadow
+        if shadow is None or self._last_full is None or now - self._last_full >= self._full_refresh:
+            self._last_full = now
+            self.full_frames += 1
+            ranges = [(0, self.frame_size)]
+        else:
+            ranges = []
+            # A gap shorter than a header costs less to resend than a new datagram
+            for start, end in _changed_ranges(self._frame, shadow):
+                if ranges and start - ranges[-1][1] < STREAM_HEADER_SIZE:
+                    ranges[-1] = (ranges[-1][0], end)
+                else:
+                    ranges.append((start, end))
+        return [
+            (offset, min(offset + self._payload, end))
+            for start, end in ranges
+            for offset in range(start, end, self._payload)
+        ]
+
+    async def _async_send_frame(self, now: float) -> None:
+        if not self._dirty:
+            return
+        self._dirty = False
+        segments = self._segments(now)
+        if not segments:
+            # Same frame as the last one sent
+            self.datagrams_saved += self._full_datagrams
+            self.bytes_saved += self._full_bytes
+            return
+        self._counter = (self._counter + 1) % 256
+        view, frame = self._view, self._frame_view
+        sent_bytes = 0
+        for index, (start, end) in enumerate(segments):
+            length = end - start
+            encode_stream_header(self._buffer, 0, index, start, length, self._serial)
+            set_stream_counter(self._buffer, 0, self._counter)
+            view[STREAM_HEADER_SIZE:STREAM_HEADER_SIZE + length] = frame[start:end]
+            if not self._controller.send_datagram(view[:STREAM_HEADER_SIZE + length]):
+                # Unknown device state: the next frame is a full one
+                self._controller.pixel_shadow = None
+                return
+            self.datagrams_sent += 1
+            sent_bytes += STREAM_HEADER_SIZE + length
+        if self._controller.pixel_shadow is None:
+            self._controller.pixel_shadow = bytearray(frame)
+        else:
+            self._controller.pixel_shadow[:] = frame
+        self.frames_sent += 1
+        self.bytes_sent += sent_bytes
+        self.datagrams_saved += self._full_datagrams - len(segments)
+        self.bytes_saved += self._full_bytes - sent_bytes
+
+    def stats(self) -> dict[str, Any]:
+        """Return the stream counters and the savings per second."""
+        elapsed = asyncio.get_running_loop().time() - self._started if self._started else 0.0
+        return {
+            "frames_sent": self.frames_sent,
+            "full_frames": self.full_frames,
+            "datagrams_sent": self.datagrams_sent,
+            "bytes_sent": self.bytes_sent,
+            "datagrams_saved_per_second": self.datagrams_saved / elapsed if elapsed else 0.0,
+            "bytes_saved_per_second": self.bytes_saved / elapsed if elapsed else 0.0,
+        }
+
+
+async def async_stream_source(stream: PixelStream, source: str, fps: float) -> int:
+    """Push the frames read from ``source`` until it ends; returns their count.
+
+    ``source`` is a file, named pipe or UNIX socket (``unix:/path``) of
+    back-to-back RGB frames of ``pixels * 3`` bytes, e.g. the output of
+    ``ffmpeg -f rawvideo -pix_fmt rgb24``. Regular files play at ``fps``.
+    """
+    loop = asyncio.get_running_loop()
+    file, realtime = await loop.run_in_executor(None, open_pcm, source)
+    frames = 0
+    next_frame = loop.time()
+    read = None
+    try:
+        while True:
+            read = loop.run_in_executor(None, file.read, stream.frame_size)
+            # Shielded: a cancelled wait must not close the file under the read
+            if len(data := await asyncio.shield(read)) < stream.frame_size:
+                break
+            stream.push(data)
+            frames += 1
+            if realtime:
+                next_frame += 1 / fps
+                if (delay := next_frame - loop.time()) > 0:
+                    await asyncio.sleep(delay)
+    finally:
+        if read is not None and not read.done():
+            # A blocked pipe read only returns with the next frame
+            read.add_done_callback(lambda _: file.close())
+        else:
+            file.close()
+    return frames
@@ -0,0 +1,19 @@
+"""Load the integration as package ``h806sb`` from the repository root.
+
+The package ``__init__`` does not import Home Assistant, so the protocol
+modules can be tested without it.
+"""
+
+import importlib.util
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parent.parent
+
+if "h806sb" not in sys.modules:
+    spec = importlib.util.spec_from_file_location(
+        "h806sb", ROOT / "__init__.py", submodule_search_locations=[str(ROOT)]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["h806sb"] = module
+    spec.loader.exec_module(module)
@@ -0,0 +1,77 @@
+"""Round trip tests of the H806SB packet codec."""
+
+import struct
+
+import pytest
+
+from h806sb.codec import (
+    CONTROL_SIZE,
+    MODE_OFF,
+    MODE_SINGLE_FILE,
+    ControlTemplate,
+    checksum,
+    decode_control,
+    decode_reply,
+    encode_reply,
+    serial_to_wire,
+)
+
+
+def test_control_round_trip():
+    template = ControlTemplate(serial_to_wire(bytes.fromhex("0c3951")))
+    packet = template.encode(7, 42, 31, MODE_SINGLE_FILE)
+    assert len(packet) == CONTROL_SIZE
+    assert packet[:2] == b"\xfb\xc1"
+    command = decode_control(bytes(packet))
+    assert command == (7, 42, 31, MODE_SINGLE_FILE, bytes.fromhex("51390c00"))
+
+
+def test_control_template_reuses_buffer():
+    template = ControlTemplate()
+    first = template.encode(1, 20, 10, MODE_SINGLE_FILE)
+    template.set_serial(b"\x01\x02\x03\x04")
+    second = template.encode(2, 20, 0, MODE_OFF)
+    assert first is second
+    assert decode_control(bytes(second)) == (2, 20, 0, MODE_OFF, b"\x01\x02\x03\x04")
+
+
+def test_decode_control_rejects_other_packets():
+    assert decode_control(b"\xfb\xc1\x00") is None
+    assert decode_control(bytes(CONTROL_SIZE)) is None
+
+
+def test_serial_to_wire_pads_and_reverses():
+    assert serial_to_wire(bytes.fromhex("0c3951")) == bytes.fromhex("51390c00")
+    assert serial_to_wire(bytes.fromhex("01020304")) == bytes.fromhex("04030201")
+    assert serial_to_wire(b"") == bytes(4)
+
+
+def test_serial_to_wire_rejects_long_serial():
+    with pytest.raises(ValueError):
+        serial_to_wire(bytes(5))
+
+
+def test_reply_round_trip():
+    assert decode_reply(encode_reply("H806SB_0c3951")) == ("H806SB_0c3951", bytes.fromhex("0c3951"))
+
+
+def test_decode_reply_without_nul():
+    assert decode_reply(b"\xab\x02H806SB_0c3951") == ("H806SB_0c3951", bytes.fromhex("0c3951"))
+
+
+def test_decode_reply_rejects_malformed():
+    assert decode_reply(b"\xab\x01H806SB_0c3951\x00") is None  # not a reply
+    assert decode_reply(b"\xab\x02H806SB0c3951\x00") is None  # no "_"
+    assert decode_reply(b"\xab\x02H806SB_0c39zz\x00") is None  # bad hex
+
+
+def test_checksum_of_known_ipv4_header():
+    header = bytes.fromhex("450000730000400040110000c0a80001c0a800c7")
+    assert checksum(header) == 0xB861
+    # A header carrying its checksum sums to zero
+    valid = header[:10] + struct.pack("!H", 0xB861) + header[12:]
+    assert checksum(valid) == 0
+
+
+def test_checksum_pads_odd_length():
+    assert checksum(b"\x01") == checksum(b"\x01\x00")
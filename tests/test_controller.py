@@ -0,0 +1,70 @@
+"""Tests of the command queue of LedController against the emulator."""
+
+import asyncio
+
+from h806sb.controller import LedController, async_send_burst
+from h806sb.emulator import H806SBEmulator
+from h806sb.transport import H806SBTransport
+
+
+async def _with_controller(test, min_interval=0.2, **kwargs):
+    async with H806SBEmulator(1, seed=0) as emulator:
+        transport = H806SBTransport(listen_port=0)
+        await transport.async_start()
+        device = emulator.devices[0]
+        controller = LedController(
+            emulator.hosts[0], emulator.port, transport, min_interval=min_interval, **kwargs
+        )
+        controller.set_serial_number(device.serial.hex())
+        try:
+            await test(controller, device)
+        finally:
+            await controller.async_close()
+            transport.close()
+
+
+def test_burst_while_command_queued():
+    async def test(controller, device):
+        await controller.async_send_packet(10, 20, True)
+        # Waits for the next send slot, 0.2 s after the first command
+        queued = asyncio.create_task(controller.async_send_packet(20, 20, True))
+        await asyncio.sleep(0.01)
+        await async_send_burst([(controller, 30, 20, True)])
+        assert await queued is True  # resolved by the burst
+        await asyncio.sleep(0.3)
+        sender = controller._sender
+        assert sender is None or (sender.done() and sender.exception() is None)
+        assert [command.brightness for _, command in device.commands] == [10, 30]
+
+    asyncio.run(_with_controller(test))
+
+
+def test_reliable_retries_stop_when_superseded():
+    async def test(controller, device):
+        device.reply = lambda addr: None  # every probe goes unanswered
+        loop = asyncio.get_running_loop()
+        off = asyncio.create_task(controller.async_send_packet(0, 20, False, reliable=True))
+        await asyncio.sleep(0.05)
+        start = loop.time()
+        assert await controller.async_send_packet(25, 20, True) is True
+        assert loop.time() - start < 0.6  # one ack timeout, not all the retries
+        assert await off is True  # resolved with the newer command
+        assert [command.brightness for _, command in device.commands] == [0, 25]
+        assert controller.metrics.retransmits == 0
+
+    asyncio.run(_with_controller(test, min_interval=0.05))
+
+
+def test_confirm_last_sent():
+    async def test(controller, device):
+        await async_send_burst([(controller, 0, 20, True)])
+        assert await controller.async_confirm_last_sent() is True
+        assert len(device.commands) == 1  # answered probe, no resend
+
+        device.reply = lambda addr: None
+        await async_send_burst([(controller, 5, 20, True)])
+        assert await controller.async_confirm_last_sent() is False
+        brightness = [command.brightness for _, command in device.commands]
+        assert brightness[1:] == [5] * (2 + controller._max_retries)
+
+    asyncio.run(_with_controller(test, min_interval=0, ack_timeout=0.05))
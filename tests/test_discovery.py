@@ -0,0 +1,47 @@
+"""Tests of the unicast sweep of extra subnets."""
+
+import asyncio
+
+from h806sb.discovery import H806SBDiscovery, SubnetSweep
+from h806sb.emulator import H806SBEmulator
+from h806sb.transport import H806SBTransport
+
+
+def test_sweep_skips_network_and_broadcast_and_wraps():
+    sweep = SubnetSweep(["10.0.0.0/30", "10.0.1.7/32", "10.0.2.0/31"])
+    assert sweep.size == 5
+    hosts = [sweep.next_host() for _ in range(7)]
+    assert hosts == [
+        "10.0.0.1", "10.0.0.2", "10.0.1.7", "10.0.2.0", "10.0.2.1", "10.0.0.1", "10.0.0.2"
+    ]
+
+
+def test_scans_to_cover():
+    sweep = SubnetSweep(["10.0.0.0/22"])  # 1022 hosts
+    assert sweep.scans_to_cover(500, 2.0) == 2
+    assert SubnetSweep(["10.0.0.0/24"]).scans_to_cover(500, 2.0) == 1
+    assert SubnetSweep().scans_to_cover(500, 2.0) == 0
+
+
+def test_successive_scans_resume_the_sweep():
+    async def run():
+        # Devices on 127.0.0.2 - 127.0.0.14, the broadcast responder outside the hosts
+        async with H806SBEmulator(13, broadcast_address="127.0.0.15") as emulator:
+            transport = H806SBTransport(listen_port=0)
+            await transport.async_start()
+            sweep = SubnetSweep(["127.0.0.0/28"])
+            found = []
+            try:
+                for _ in range(3):
+                    # Nothing answers this broadcast, replies come from the sweep
+                    discovery = H806SBDiscovery(
+                        transport, "127.0.0.250", subnets=sweep, unicast_rate=25
+                    )
+                    found.append({device.ip async for device in discovery.async_discover(0.3)})
+            finally:
+                transport.close()
+            return emulator.hosts, found
+
+    hosts, found = asyncio.run(run())
+    assert len(found[0]) < len(hosts)
+    assert set().union(*found) == set(hosts)
@@ -0,0 +1,86 @@
+"""Tests of the effect engine and its timer wheel."""
+
+import asyncio
+
+from h806sb import effects
+from h806sb.effects import EFFECT_STROBE, EffectEngine, TimerWheel
+
+
+def _expiry_ticks(wheel, until):
+    expired = {}
+    for tick in range(1, until + 1):
+        for item in wheel.advance(tick):
+            expired[item] = tick
+    return expired
+
+
+def test_timers_expire_at_their_tick_on_every_level():
+    wheel = TimerWheel(bits=3, levels=3)  # 8 slots per level, horizon 511 ticks
+    ticks = [1, 7, 8, 9, 63, 64, 65, 300, 511, 700]
+    for tick in ticks:
+        wheel.schedule(tick, f"t{tick}")
+    assert len(wheel) == len(ticks)
+    assert _expiry_ticks(wheel, 800) == {f"t{tick}": tick for tick in ticks}
+    assert len(wheel) == 0
+
+
+def test_past_timer_expires_on_next_tick():
+    wheel = TimerWheel()
+    wheel.advance(10)
+    wheel.schedule(3, "late")
+    assert wheel.advance(11) == ["late"]
+
+
+def test_advance_over_many_ticks_returns_everything_due():
+    wheel = TimerWheel(bits=2, levels=3)
+    for tick in (2, 5, 17, 40):
+        wheel.schedule(tick, tick)
+    assert sorted(wheel.advance(20)) == [2, 5, 17]
+    assert wheel.advance(40) == [40]
+
+
+def test_next_tick():
+    wheel = TimerWheel(bits=3, levels=2)
+    assert wheel.next_tick() is None
+    wheel.schedule(5, "a")
+    assert wheel.next_tick() == 5
+    wheel.schedule(3, "b")
+    assert wheel.next_tick() == 3
+    wheel.advance(5)
+    # Timers of the upper level: the next cascade point comes first
+    wheel.schedule(20, "c")
+    assert wheel.next_tick() == 8
+    assert _expiry_ticks(wheel, 30) == {"c": 20}
+
+
+def test_reset_needs_an_empty_wheel():
+    wheel = TimerWheel()
+    wheel.reset(100)
+    wheel.schedule(101, "a")
+    assert wheel.advance(101) == ["a"]
+
+
+def test_effect_started_while_engine_sleeps_keeps_its_step_time(monkeypatch):
+    sent = {}
+
+    async def _send_burst(commands):
+        now = asyncio.get_running_loop().time()
+        for controller, _level, _speed, _wait in commands:
+            sent.setdefault(controller, []).append(now)
+
+    monkeypatch.setattr(effects, "async_send_burst", _send_burst)
+
+    async def test():
+        engine = EffectEngine()
+        engine.start(EFFECT_STROBE, ["slow"], 255, 0, period=2.0)
+        # The engine sleeps for a second until the next slow step
+        await asyncio.sleep(0.5)
+        engine.start(EFFECT_STROBE, ["fast"], 255, 0, period=0.2)
+        await asyncio.sleep(0.35)
+        engine.close()
+
+    asyncio.run(test())
+    times = sent["fast"]
+    assert len(times) >= 3
+    gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+    assert min(gaps) >= 0.09
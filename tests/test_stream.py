@@ -0,0 +1,122 @@
+"""Tests of the delta frames of PixelStream."""
+
+import asyncio
+
+import pytest
+
+from h806sb import stream
+from h806sb.codec import STREAM_HEADER_SIZE, decode_stream
+from h806sb.stream import PixelStream, _changed_ranges
+
+
+class FakeController:
+    """Collects the datagrams a stream sends."""
+
+    def __init__(self):
+        self._serial_number = bytearray(b"\x51\x39\x0c\x00")
+        self.pixel_shadow = None
+        self.datagrams = []
+
+    def send_datagram(self, data):
+        self.datagrams.append(bytes(data))
+        return True
+
+
+def _chunks(controller):
+    chunks = [decode_stream(datagram) for datagram in controller.datagrams]
+    controller.datagrams.clear()
+    return [(header.offset, bytes(payload)) for header, payload in chunks]
+
+
+@pytest.fixture(params=["numpy", "blocks"])
+def numpy_mode(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(stream, "np", None)
+    return request.param
+
+
+def test_changed_ranges(numpy_mode):
+    shadow = bytearray(300 * 3)
+    frame = bytearray(shadow)
+    frame[3 * 5] = 1
+    frame[3 * 200 + 2] = 1
+    ranges = _changed_ranges(frame, shadow)
+    if numpy_mode == "numpy":
+        assert ranges == [(15, 18), (600, 603)]
+    else:
+        block = stream._BLOCK_PIXELS * 3
+        assert ranges == [(0, block), (600 // block * block, 600 // block * block + block)]
+    assert _changed_ranges(shadow, bytearray(shadow)) == []
+
+
+def test_delta_frames(numpy_mode):
+    async def run():
+        controller = FakeController()
+        pixels = PixelStream(controller, 1000, max_payload=1200, full_refresh=1.0)
+        frame = bytearray(3000)
+
+        # The first frame is a full one, split into payload-sized chunks
+        pixels.push(frame)
+        await pixels._async_send_frame(0.0)
+        assert [(offset, len(data)) for offset, data in _chunks(controller)] == [
+            (0, 1200), (1200, 1200), (2400, 600)
+        ]
+        assert controller.pixel_shadow == frame
+
+        # Only the changed pixels follow
+        frame[30:33] = b"\xff\x00\x00"
+        frame[2997:3000] = b"\x00\x00\xff"
+        pixels.push(frame)
+        await pixels._async_send_frame(0.1)
+        chunks = _chunks(controller)
+        assert len(chunks) == 2
+        for offset, data in chunks:
+            assert data == frame[offset:offset + len(data)]
+        assert pixels.datagrams_saved == 1
+
+        # An unchanged frame sends nothing
+        pixels.push(frame)
+        await pixels._async_send_frame(0.2)
+        assert _chunks(controller) == []
+
+        # The refresh interval forces a full frame again
+        pixels.push(frame)
+        await pixels._async_send_frame(1.0)
+        assert sum(len(data) for _, data in _chunks(controller)) == 3000
+        assert pixels.full_frames == 2
+
+    asyncio.run(run())
+
+
+def test_short_gaps_are_merged(numpy_mode):
+    async def run():
+        controller = FakeController()
+        pixels = PixelStream(controller, 100, full_refresh=10.0)
+        frame = bytearray(300)
+        pixels.push(frame)
+        await pixels._async_send_frame(0.0)
+        controller.datagrams.clear()
+        # Two pixels one pixel apart: resending the gap beats a second header
+        frame[0:3] = frame[6:9] = b"\x01\x01\x01"
+        pixels.push(frame)
+        await pixels._async_send_frame(0.1)
+        assert len(controller.datagrams) == 1
+        assert len(controller.datagrams[0]) - STREAM_HEADER_SIZE <= 48
+
+    asyncio.run(run())
+
+
+def test_stream_source_pushes_whole_frames(tmp_path):
+    source = tmp_path / "frames.rgb"
+    source.write_bytes(bytes(range(30)) * 3 + b"\x01\x02")  # 3 frames and a partial one
+
+    async def run():
+        pixels = PixelStream(FakeController(), 10)
+        frames = await stream.async_stream_source(pixels, str(source), fps=100)
+        return frames, pixels
+
+    frames, pixels = asyncio.run(run())
+    assert frames == pixels.frames_pushed == 3
+    assert bytes(pixels._frame) == bytes(range(30))
@@ -0,0 +1,163 @@
+"""Client-side transitions for H806SB controllers.
+
+All running transitions share one :class:`FrameClock`, so fading 50 lights
+costs one timer. Every frame the changed device levels are sent in a
+single burst.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+import logging
+import math
+
+from .controller import LedController, async_send_burst
+
+_LOGGER = logging.getLogger(__name__)
+
+FRAME_RATE = 20  # the device accepts a command every 50 ms
+
+FrameCallback = Callable[[float], Awaitable[None]]
+
+
+class FrameClock:
+    """Drift-free periodic clock shared by every animation.
+
+    Frame ``n`` is due at ``start + n * period`` on the loop clock, so the
+    time spent rendering does not accumulate. Frames the loop was too busy
+    for are skipped instead of being played back late. The task only runs
+    while there are subscribers.
+    """
+
+    def __init__(self, fps: float = FRAME_RATE) -> None:
+        self.period = 1 / fps
+        self._subscribers: list[FrameCallback] = []
+        self._task: asyncio.Task | None = None
+        self.frames = 0
+        self.skipped = 0
+
+    def subscribe(self, callback: FrameCallback) -> Callable[[], None]:
+        """Call ``callback(now)`` every frame; returns an unsubscribe function."""
+        self._subscribers.append(callback)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._async_run())
+
+        def _unsubscribe() -> None:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+        return _unsubscribe
+
+    async def _async_run(self) -> None:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        frame = 0
+        while self._subscribers:
+            now = loop.time()
+            for callback in list(self._subscribers):
+                try:
+                    await callback(now)
+                except Exception:  # one broken animation must not stop the others
+                    _LOGGER.exception("Error rendering frame")
+            self.frames += 1
+            frame += 1
+            due = start + frame * self.period
+            now = loop.time()
+            if now > due:
+                late = math.ceil((now - due) / self.period)
+                self.skipped += late
+                frame += late
+                due = start + frame * self.period
+            await asyncio.sleep(due - now)
+
+    def close(self) -> None:
+        """Stop the clock."""
+        self._subscribers.clear()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+@dataclass(slots=True)
+class Transition:
+    """Linear fade of the device brightness (0-31)."""
+
+    start_value: float
+    target: int
+    start_time: float
+    duration: float
+    speed: int
+    on_done: Callable[[], None] | None = None
+    last_sent: int | None = None
+
+    def value_at(self, now: float) -> float:
+        """Return the interpolated brightness at ``now``."""
+        if self.duration <= 0:
+            return self.target
+        progress = min(1.0, (now - self.start_time) / self.duration)
+        return self.start_value + (self.target - self.start_value) * progress
+
+    def finished(self, now: float) -> bool:
+        """Return True once the duration has passed."""
+        return now - self.start_time >= self.duration
+
+
+class TransitionEngine:
+    """Fades many controllers on one frame clock."""
+
+    def __init__(self, clock: FrameClock) -> None:
+        self._clock = clock
+        self._transitions: dict[LedController, Transition] = {}
+        self._unsubscribe: Callable[[], None] | None = None
+
+    def start(
+        self,
+        controller: LedController,
+        current: float,
+        target: int,
+        duration: float,
+        speed: int,
+        on_done: Callable[[], None] | None = None,
+    ) -> None:
+        """Fade ``controller`` from ``current`` to ``target``.
+
+        A transition already running on the controller is retargeted: the
+        new one starts from the level it has reached.
+        """
+        now = asyncio.get_running_loop().time()
+        if (running := self._transitions.get(controller)) is not None:
+            current = running.value_at(now)
+        self._transitions[controller] = Transition(current, target, now, duration, speed, on_done)
+        if self._unsubscribe is None:
+            self._unsubscribe = self._clock.subscribe(self._async_render)
+
+    def cancel(self, controller: LedController) -> float | None:
+        """Stop the transition of ``controller``; returns the level reached."""
+        if (running := self._transitions.pop(controller, None)) is None:
+            return None
+        return running.value_at(asyncio.get_running_loop().time())
+
+    async def _async_render(self, now: float) -> None:
+        commands = []
+        done = []
+        for controller, transition in self._transitions.items():
+            level = round(transition.value_at(now))
+            if level != transition.last_sent:
+                transition.last_sent = level
+                commands.append((controller, level, transition.speed, True))
+            if transition.finished(now):
+                done.append(controller)
+        if commands:
+            await async_send_burst(commands)
+        for controller in done:
+            # A new transition may have replaced the finished one during the send
+            transition = self._transitions.get(controller)
+            if transition is not None and transition.finished(now):
+                del self._transitions[controller]
+                if transition.on_done:
+                    transition.on_done()
+        if not self._transitions and self._unsubscribe:
+            self._unsubscribe()
+            self._unsubscribe = None
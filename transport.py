@@ -0,0 +1,226 @@
+"""Shared UDP endpoint for H806SB controllers."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import socket
+from collections.abc import Callable
+from typing import Optional, Tuple
+
+from .capture import PacketCapture
+from .codec import decode_reply
+
+_LOGGER = logging.getLogger(__name__)
+
+DEVICE_PORT = 4626
+LISTEN_PORT = 4882
+
+ReplyListener = Callable[[str, str, bytes], None]
+
+
+class H806SBProtocol(asyncio.DatagramProtocol):
+    """Datagram protocol that hands every reply to the owning transport."""
+
+    def __init__(self, owner: H806SBTransport) -> None:
+        self._owner = owner
+
+    def datagram_received(self, data: bytes, addr: tuple) -> None:
+        self._owner._dispatch(data, addr)
+
+    def error_received(self, exc: Exception) -> None:
+        _LOGGER.debug("UDP error received: %s", exc)
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self._owner._connection_lost(exc)
+
+
+class H806SBTransport:
+    """One UDP socket shared by every controller of a Home Assistant instance.
+
+    Replies are routed to the waiter registered for the source IP and, when
+    the waiter knows it, the serial number carried in the reply. With a
+    ``capture`` set, every datagram in and out (including the device
+    channels) is recorded in it.
+    """
+
+    def __init__(self, listen_port: int = LISTEN_PORT) -> None:
+        self._listen_port = listen_port
+        self._transport: asyncio.DatagramTransport | None = None
+        self._start_lock = asyncio.Lock()
+        self._sockname: tuple[str, int] = ("0.0.0.0", listen_port)
+        self.capture: PacketCapture | None = None
+        self._waiters: dict[str, list[tuple[int | None, asyncio.Future]]] = {}
+        self._listeners: list[ReplyListener] = []
+
+    @property
+    def started(self) -> bool:
+        """Return True while the socket is open."""
+        return self._transport is not None and not self._transport.is_closing()
+
+    def _create_socket(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        sock.setblocking(False)
+        try:
+            sock.bind(("0.0.0.0", self._listen_port))
+        except OSError as err:
+            _LOGGER.warning(
+                "Could not bind to port %s: %s, using random port",
+                self._listen_port, err,
+            )
+            try:
+                sock.bind(("0.0.0.0", 0))
+            except OSError:
+                sock.close()
+                raise
+        _LOGGER.debug("Shared socket bound to port %s", sock.getsockname()[1])
+        return sock
+
+    async def async_start(self) -> None:
+        """Open the shared socket if it is not open yet."""
+        # Concurrent callers must not open a second socket
+        async with self._start_lock:
+            if self.started:
+                return
+            loop = asyncio.get_running_loop()
+            self._transport, _ = await loop.create_datagram_endpoint(
+                lambda: H806SBProtocol(self), sock=self._create_socket()
+            )
+            self._sockname = self._transport.get_extra_info("sockname")[:2]
+
+    def sendto(self, data: bytes, addr: tuple[str, int]) -> None:
+        """Queue a datagram without waiting for the kernel."""
+        if not self.started:
+            raise ConnectionError("Shared transport is not started")
+        self._transport.sendto(data, addr)
+        if self.capture is not None:
+            self.capture.record(True, self._sockname, addr, data)
+
+    async def async_request(
+        self,
+        packet: bytes,
+        addr: tuple[str, int],
+        serial: int | None = None,
+        timeout: float = 2.0,
+    ) -> Optional[Tuple[str, bytes]]:
+        """Send ``packet`` and wait for the matching ``AB 02`` reply.
+
+        ``serial`` is the numeric serial number expected in the reply; replies
+        from the same IP carrying another serial are not accepted.
+        """
+        future = asyncio.get_running_loop().create_future()
+        waiter = (serial or None, future)
+        waiters = self._waiters.setdefault(addr[0], [])
+        waiters.append(waiter)
+        try:
+            self.sendto(packet, addr)
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            waiters.remove(waiter)
+            if not waiters:
+                self._waiters.pop(addr[0], None)
+
+    def add_listener(self, listener: ReplyListener) -> Callable[[], None]:
+        """Register a callback for every valid reply; returns a remover."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def _dispatch(self, data: bytes, addr: tuple, local: tuple | None = None) -> None:
+        if self.capture is not None:
+            self.capture.record(False, local or self._sockname, addr[:2], data)
+        reply = decode_reply(data)
+        if reply is None:
+            _LOGGER.debug("Ignoring datagram from %s", addr[0])
+            return
+        name, serial = reply
+        serial_value = int.from_bytes(serial, "big")
+        for expected, future in self._waiters.get(addr[0], ()):
+            if future.done() or expected not in (None, serial_value):
+                continue
+            future.set_result(reply)
+        for listener in list(self._listeners):
+            listener(addr[0], name, serial)
+
+    def _connection_lost(self, exc: Exception | None) -> None:
+        if exc:
+            _LOGGER.warning("Shared socket closed: %s", exc)
+        self._transport = None
+
+    def close(self) -> None:
+        """Close the shared socket and fail pending waiters."""
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+        for waiters in self._waiters.values():
+            for _, future in waiters:
+                if not future.done():
+                    future.set_exception(ConnectionError("Shared transport closed"))
+
+
+class _ChannelProtocol(asyncio.DatagramProtocol):
+    """Protocol of a device channel, stray replies go to the shared transport."""
+
+    def __init__(self, channel: H806SBDeviceChannel) -> None:
+        self._channel = channel
+
+    def datagram_received(self, data: bytes, addr: tuple) -> None:
+        if self._channel._shared is not None:
+            self._channel._shared._dispatch(data, addr, self._channel._sockname)
+
+    def error_received(self, exc: Exception) -> None:
+        # A connected socket reports ICMP errors, e.g. port unreachable
+        _LOGGER.debug("UDP error on channel to %s: %s", self._channel.addr[0], exc)
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self._channel._transport = None
+
+
+class H806SBDeviceChannel:
+    """Connected UDP socket to one device, used for sending.
+
+    The destination is fixed when the socket is connected, so a send is a
+    single non-blocking write without an address lookup. Devices answer on
+    the shared listen port; anything arriving here is handed to the shared
+    transport anyway.
+    """
+
+    def __init__(self, addr: tuple[str, int], shared: H806SBTransport | None = None) -> None:
+        self.addr = addr
+        self._shared = shared
+        self._transport: asyncio.DatagramTransport | None = None
+        self._open_lock = asyncio.Lock()
+        self._sockname: tuple[str, int] = ("0.0.0.0", 0)
+
+    @property
+    def open(self) -> bool:
+        """Return True while the socket is connected."""
+        return self._transport is not None and not self._transport.is_closing()
+
+    async def async_open(self) -> None:
+        """Connect the socket if it is not connected yet."""
+        async with self._open_lock:
+            if self.open:
+                return
+            loop = asyncio.get_running_loop()
+            self._transport, _ = await loop.create_datagram_endpoint(
+                lambda: _ChannelProtocol(self), remote_addr=self.addr
+            )
+            self._sockname = self._transport.get_extra_info("sockname")[:2]
+
+    def send(self, data: bytes) -> None:
+        """Queue a datagram without waiting for the kernel."""
+        if not self.open:
+            raise ConnectionError(f"Channel to {self.addr[0]} is not open")
+        self._transport.sendto(data)
+        if self._shared is not None and self._shared.capture is not None:
+            self._shared.capture.record(True, self._sockname, self.addr, data)
+
+    def close(self) -> None:
+        """Close the socket."""
+        if self._transport:
+            self._transport.close()
+            self._transport = None